@@ -1,80 +1,261 @@
 import sys
+import threading
+import time
+from contextlib import contextmanager
 
-import mysql.connector
+from mysql.connector import errors, pooling
 
+from _metrics import metrics
+from _profiler import query_profiler
 from settings import CONFIG
 
+DB_POOL_NAME = getattr(CONFIG, "DB_POOL_NAME", "tinyzonetv")
+DB_POOL_SIZE = getattr(CONFIG, "DB_POOL_SIZE", 5)
+DB_POOL_RESET_SESSION = getattr(CONFIG, "DB_POOL_RESET_SESSION", False)
+DB_POOL_WAIT_TIMEOUT = getattr(CONFIG, "DB_POOL_WAIT_TIMEOUT", 30)
+DB_RECONNECT_ATTEMPTS = getattr(CONFIG, "DB_RECONNECT_ATTEMPTS", 3)
+DB_RECONNECT_DELAY = getattr(CONFIG, "DB_RECONNECT_DELAY", 1)
+DB_BULK_CHUNK_ROWS = getattr(CONFIG, "DB_BULK_CHUNK_ROWS", 1000)
 
-class Database:
-    def get_conn(self):
+STALE_CONNECTION_ERRNOS = (2006, 2013, 2055)
+
+# @@max_allowed_packet, @@auto_increment_increment and @@innodb_autoinc_lock_mode,
+# read once per process
+SERVER_LIMITS = {}
+
+
+class Session:
+    def __init__(self, conn):
+        self.conn = conn
+        self.in_transaction = False
+        self.rollback_hooks = []
+        # table -> rows waiting for a multi-row INSERT, while batching
+        self.buffers = None
+
+    def reconnect(self):
+        self.conn.reconnect(attempts=DB_RECONNECT_ATTEMPTS, delay=DB_RECONNECT_DELAY)
+
+    def execute(self, query: str, data=None, is_bulk: bool = False):
         try:
-            return mysql.connector.connect(
-                user=CONFIG.user,
-                password=CONFIG.password,
-                host=CONFIG.host,
-                port=CONFIG.port,
-                database=CONFIG.database,
-            )
-        except Exception as e:
-            print(f"Error connecting to MariaDB Platform: {e}")
-            sys.exit(1)
+            return self._execute(query, data, is_bulk)
+        except (errors.OperationalError, errors.InterfaceError) as e:
+            # Reconnecting mid-transaction would silently drop its earlier writes
+            if e.errno not in STALE_CONNECTION_ERRNOS or self.in_transaction:
+                raise
+            self.reconnect()
+            return self._execute(query, data, is_bulk)
 
-    def select_with(self, query: str) -> list:
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(query)
+    def _execute(self, query: str, data=None, is_bulk: bool = False):
+        stage = "db_read" if query.lstrip()[:6].upper() == "SELECT" else "db_write"
+        with metrics.time(stage):
+            cur = query_profiler.cursor(self.conn.cursor(), query)
+            if is_bulk:
+                cur.executemany(query, data)
+            else:
+                cur.execute(query, data)
+        return cur
+
+    def begin(self):
+        if self.conn.in_transaction:
+            self.conn.rollback()
+        self.conn.start_transaction()
+        self.in_transaction = True
+
+    def end(self, is_commit: bool = True):
+        self.in_transaction = False
+        rollback_hooks, self.rollback_hooks = self.rollback_hooks, []
+        if is_commit:
+            try:
+                self.conn.commit()
+                return
+            except BaseException:
+                # Nothing was written; caches filled by the transaction must forget it
+                self._rollback(rollback_hooks)
+                raise
+
+        self._rollback(rollback_hooks)
+
+    def _rollback(self, rollback_hooks: list):
+        if self.buffers:
+            # Rows buffered inside a rolled back transaction go with it
+            self.buffers.clear()
+
+        try:
+            self.conn.rollback()
+        finally:
+            for hook in rollback_hooks:
+                hook()
+
+    def commit(self):
+        if not self.in_transaction:
+            self.conn.commit()
+
+    def select_with(self, query: str, data: tuple = None) -> list:
+        cur = self.execute(query, data)
         res = cur.fetchall()
         cur.close()
-        conn.close()
 
         return res
 
     def select_all_from(self, table: str, condition: str = "1=1", cols: str = "*"):
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(f"SELECT {cols} FROM {table} WHERE {condition}")
-        res = cur.fetchall()
-        cur.close()
-        conn.close()
+        return self.select_with(f"SELECT {cols} FROM {table} WHERE {condition}")
 
-        return res
+    def iter_with(self, query: str, batch_size: int = 1000):
+        cur = self.execute(query)
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cur.close()
 
-    def insert_into(self, table: str, data: tuple = None, is_bulk: bool = False):
-        conn = self.get_conn()
-        cur = conn.cursor()
-        id = 0
+    def server_limits(self) -> dict:
+        if not SERVER_LIMITS:
+            max_packet, increment, autoinc_lock_mode = self.select_with(
+                "SELECT @@max_allowed_packet, @@auto_increment_increment, "
+                "@@innodb_autoinc_lock_mode"
+            )[0]
+            SERVER_LIMITS.update(
+                max_packet=int(max_packet),
+                increment=int(increment),
+                autoinc_lock_mode=int(autoinc_lock_mode),
+            )
+
+        return SERVER_LIMITS
+
+    def bulk_insert(
+        self,
+        table: str,
+        rows: list,
+        chunk_rows: int = DB_BULK_CHUNK_ROWS,
+        max_bytes: int = None,
+        on_duplicate: str = None,
+        update_columns: tuple = (),
+        return_ids: bool = False,
+    ) -> list:
+        if not rows:
+            return []
+
+        limits = self.server_limits()
+        if return_ids:
+            if on_duplicate is not None:
+                raise ValueError("Ids can't be returned for skipped or updated rows")
+            # With interleaved locking, concurrent inserts can split a statement's
+            # ids, so only a single-row INSERT's id is known
+            if limits["autoinc_lock_mode"] == 2:
+                chunk_rows = 1
+        # Leave room for escaping and the statement around the values
+        max_bytes = max_bytes or limits["max_packet"] // 2
+
+        columns = f"({', '.join(CONFIG.INSERT[table])})"
+        row_values = f"({', '.join(['%s'] * len(CONFIG.INSERT[table]))})"
+        ignore = " IGNORE" if on_duplicate == "ignore" else ""
+        prefix = f"INSERT{ignore} INTO {table} {columns} VALUES "
+        suffix = ""
+        if on_duplicate == "update":
+            suffix = " ON DUPLICATE KEY UPDATE " + ", ".join(
+                f"{column}=VALUES({column})"
+                for column in update_columns or CONFIG.INSERT[table]
+            )
+        elif on_duplicate not in (None, "ignore"):
+            raise ValueError(f"Unknown on_duplicate: {on_duplicate}")
+
+        ids = []
+        start = 0
+        while start < len(rows):
+            size = len(prefix) + len(suffix)
+            end = start
+            while end < len(rows) and end - start < chunk_rows:
+                size += sum(len(str(value).encode("utf-8")) + 4 for value in rows[end])
+                if size > max_bytes and end > start:
+                    break
+                end += 1
+
+            chunk = rows[start:end]
+            cur = self.execute(
+                prefix + ", ".join([row_values] * len(chunk)) + suffix,
+                [value for row in chunk for value in row],
+            )
+            # Outside interleaved locking, InnoDB hands a multi-row INSERT one
+            # block of auto-increment ids and reports the first one
+            if return_ids:
+                ids.extend(
+                    range(
+                        cur.lastrowid,
+                        cur.lastrowid + cur.rowcount * limits["increment"],
+                        limits["increment"],
+                    )
+                )
+            cur.close()
+            start = end
+
+        self.commit()
+        return ids
+
+    def flush(self, key: tuple = None):
+        if not self.buffers:
+            return
+
+        for key in [key] if key else list(self.buffers):
+            rows = self.buffers.pop(key, [])
+            if rows:
+                name, on_duplicate, update_columns = key
+                self.bulk_insert(
+                    name,
+                    rows,
+                    on_duplicate=on_duplicate,
+                    update_columns=update_columns,
+                )
+
+    def insert_into(
+        self,
+        table: str,
+        data: tuple = None,
+        is_bulk: bool = False,
+        on_duplicate: str = None,
+        update_columns: tuple = (),
+    ):
+        if is_bulk:
+            if self.buffers is None:
+                self.bulk_insert(
+                    table,
+                    list(data),
+                    on_duplicate=on_duplicate,
+                    update_columns=update_columns,
+                )
+                return 0
+
+            # Batching: the rows go out with other films' rows in a later flush
+            key = (table, on_duplicate, tuple(update_columns))
+            buffer = self.buffers.setdefault(key, [])
+            buffer.extend(data)
+            if len(buffer) >= DB_BULK_CHUNK_ROWS:
+                self.flush(key)
+            return 0
 
         columns = f"({', '.join(CONFIG.INSERT[table])})"
         values = f"({', '.join(['%s'] * len(CONFIG.INSERT[table]))})"
         query = f"INSERT INTO {table} {columns} VALUES {values}"
-        if is_bulk:
-            cur.executemany(query, data)
-        else:
-            cur.execute(query, data)
-            id = cur.lastrowid
+        cur = self.execute(query, data)
+        id = cur.lastrowid
 
-        conn.commit()
+        self.commit()
         cur.close()
-        conn.close()
         return id
 
     def update_table(
         self, table: str, set_cond: str, where_cond: str, data: tuple = ()
     ):
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(f"UPDATE {table} set {set_cond} WHERE {where_cond}", data)
-        conn.commit()
+        cur = self.execute(f"UPDATE {table} set {set_cond} WHERE {where_cond}", data)
+        self.commit()
         cur.close()
-        conn.close()
 
     def delete_from(self, table: str = "", condition: str = "1=1"):
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute(f"DELETE FROM {table} WHERE {condition}")
-        conn.commit()
+        cur = self.execute(f"DELETE FROM {table} WHERE {condition}")
+        self.commit()
         cur.close()
-        conn.close()
 
     def select_or_insert(self, table: str, condition: str, data: tuple):
         res = self.select_all_from(table=table, condition=condition)
@@ -84,6 +265,170 @@ class Database:
         return res
 
 
+class Database:
+    def __init__(self):
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_pool(self) -> pooling.MySQLConnectionPool:
+        with self._pool_lock:
+            if self._pool is None:
+                try:
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name=DB_POOL_NAME,
+                        pool_size=DB_POOL_SIZE,
+                        pool_reset_session=DB_POOL_RESET_SESSION,
+                        user=CONFIG.user,
+                        password=CONFIG.password,
+                        host=CONFIG.host,
+                        port=CONFIG.port,
+                        database=CONFIG.database,
+                    )
+                except Exception as e:
+                    print(f"Error connecting to MariaDB Platform: {e}")
+                    sys.exit(1)
+
+            return self._pool
+
+    def get_conn(self):
+        pool = self.get_pool()
+        deadline = time.monotonic() + DB_POOL_WAIT_TIMEOUT
+        while True:
+            try:
+                # Checkout pings the connection and reconnects it if it went stale
+                return pool.get_connection()
+            except errors.PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+    @contextmanager
+    def session(self):
+        current = getattr(self._local, "session", None)
+        if current is not None:
+            yield current
+            return
+
+        conn = self.get_conn()
+        session = Session(conn)
+        self._local.session = session
+        try:
+            yield session
+        finally:
+            self._local.session = None
+            try:
+                # Don't hand a connection with an open read snapshot back to the pool
+                if conn.in_transaction:
+                    conn.rollback()
+            finally:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.session() as s:
+            if s.in_transaction:
+                yield s
+                return
+
+            s.begin()
+            try:
+                yield s
+                s.flush()
+            except BaseException:
+                s.end(is_commit=False)
+                raise
+            s.end()
+
+    @contextmanager
+    def batch(self):
+        # Defers bulk inserts (rows that need no ids back) into multi-row INSERTs
+        # shared across films. Reads in the batch don't see the deferred rows.
+        # Inside a transaction they're flushed before it commits.
+        with self.session() as s:
+            if s.buffers is not None:
+                yield s
+                return
+
+            s.buffers = {}
+            try:
+                yield s
+                s.flush()
+            finally:
+                s.buffers = None
+
+    def on_rollback(self, hook):
+        session = getattr(self._local, "session", None)
+        if session is not None and session.in_transaction:
+            session.rollback_hooks.append(hook)
+
+    def select_with(self, query: str, data: tuple = None) -> list:
+        with self.session() as s:
+            return s.select_with(query, data)
+
+    def select_all_from(self, table: str, condition: str = "1=1", cols: str = "*"):
+        with self.session() as s:
+            return s.select_all_from(table=table, condition=condition, cols=cols)
+
+    def iter_with(self, query: str, batch_size: int = 1000):
+        with self.session() as s:
+            yield from s.iter_with(query, batch_size=batch_size)
+
+    def insert_into(
+        self,
+        table: str,
+        data: tuple = None,
+        is_bulk: bool = False,
+        on_duplicate: str = None,
+        update_columns: tuple = (),
+    ):
+        with self.session() as s:
+            return s.insert_into(
+                table=table,
+                data=data,
+                is_bulk=is_bulk,
+                on_duplicate=on_duplicate,
+                update_columns=update_columns,
+            )
+
+    def bulk_insert(
+        self,
+        table: str,
+        rows: list,
+        chunk_rows: int = DB_BULK_CHUNK_ROWS,
+        max_bytes: int = None,
+        on_duplicate: str = None,
+        update_columns: tuple = (),
+        return_ids: bool = False,
+    ) -> list:
+        with self.session() as s:
+            return s.bulk_insert(
+                table=table,
+                rows=rows,
+                chunk_rows=chunk_rows,
+                max_bytes=max_bytes,
+                on_duplicate=on_duplicate,
+                update_columns=update_columns,
+                return_ids=return_ids,
+            )
+
+    def update_table(
+        self, table: str, set_cond: str, where_cond: str, data: tuple = ()
+    ):
+        with self.session() as s:
+            s.update_table(
+                table=table, set_cond=set_cond, where_cond=where_cond, data=data
+            )
+
+    def delete_from(self, table: str = "", condition: str = "1=1"):
+        with self.session() as s:
+            s.delete_from(table=table, condition=condition)
+
+    def select_or_insert(self, table: str, condition: str, data: tuple):
+        with self.session() as s:
+            return s.select_or_insert(table=table, condition=condition, data=data)
+
+
 database = Database()
 
 
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import time
+
+from _storage import SqliteStore
+from settings import CONFIG
+
+FINGERPRINT_DB = getattr(CONFIG, "FINGERPRINT_DB", "cache/fingerprints.sqlite3")
+LISTING_MAX_FAILURES = getattr(CONFIG, "LISTING_MAX_FAILURES", 3)
+
+
+def normalize(value):
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def fingerprint(film_data: dict, episodes_data: dict) -> str:
+    payload = json.dumps(
+        normalize({"film": film_data, "episodes": episodes_data}),
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def listing_fingerprint(item: dict) -> str:
+    # What a listing card shows about a film: a new episode changes fd_infor
+    payload = json.dumps(
+        normalize([item["slug"], item["fd_infor"], item["quality"]]),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore(SqliteStore):
+    schema = "".join(
+        f"CREATE TABLE IF NOT EXISTS {table} ("
+        "post_type TEXT NOT NULL, slug TEXT NOT NULL, "
+        "digest TEXT NOT NULL, updated_at REAL NOT NULL, "
+        "PRIMARY KEY (post_type, slug));"
+        for table in ["fingerprints", "listings"]
+    ) + (
+        "CREATE TABLE IF NOT EXISTS listing_failures ("
+        "post_type TEXT NOT NULL, slug TEXT NOT NULL, digest TEXT NOT NULL, "
+        "failures INTEGER NOT NULL, updated_at REAL NOT NULL, "
+        "PRIMARY KEY (post_type, slug));"
+    )
+
+    def __init__(self, path: str = FINGERPRINT_DB):
+        super().__init__(path)
+        self.written = 0
+        self.skipped = 0
+
+    def get(self, post_type: str, slug: str, table: str = "fingerprints") -> str:
+        with self._lock:
+            row = (
+                self.get_conn()
+                .execute(
+                    f"SELECT digest FROM {table} WHERE post_type=? AND slug=?",
+                    (post_type, slug),
+                )
+                .fetchone()
+            )
+        return row[0] if row else ""
+
+    def put(self, post_type: str, slug: str, digest: str, table: str = "fingerprints"):
+        with self._lock:
+            conn = self.get_conn()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+                (post_type, slug, digest, time.time()),
+            )
+            if table == "listings":
+                conn.execute(
+                    "DELETE FROM listing_failures WHERE post_type=? AND slug=?",
+                    (post_type, slug),
+                )
+            conn.commit()
+            if table == "fingerprints":
+                self.written += 1
+
+    def fail_listing(self, post_type: str, slug: str, digest: str):
+        # Failures count per card: a changed card gets a fresh set of attempts
+        with self._lock:
+            conn = self.get_conn()
+            conn.execute(
+                "INSERT INTO listing_failures VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (post_type, slug) DO UPDATE SET "
+                "failures=CASE WHEN digest=excluded.digest THEN failures+1 ELSE 1 END, "
+                "digest=excluded.digest, updated_at=excluded.updated_at",
+                (post_type, slug, digest, time.time()),
+            )
+            conn.commit()
+
+    def is_failing(
+        self, post_type: str, slug: str, digest: str, limit: int = LISTING_MAX_FAILURES
+    ) -> bool:
+        with self._lock:
+            row = (
+                self.get_conn()
+                .execute(
+                    "SELECT failures FROM listing_failures "
+                    "WHERE post_type=? AND slug=? AND digest=?",
+                    (post_type, slug, digest),
+                )
+                .fetchone()
+            )
+        return bool(row) and row[0] >= limit
+
+    def is_unchanged(self, post_type: str, slug: str, digest: str) -> bool:
+        if self.get(post_type, slug) != digest:
+            return False
+
+        with self._lock:
+            self.skipped += 1
+        return True
+
+    def report(self):
+        logging.info(
+            f"Films written: {self.written}, skipped unchanged: {self.skipped}"
+        )
+
+
+fingerprint_store = FingerprintStore()
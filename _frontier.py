@@ -0,0 +1,140 @@
+import logging
+import time
+
+from _storage import SqliteStore
+from settings import CONFIG
+
+FRONTIER_DB = getattr(CONFIG, "FRONTIER_DB", "cache/frontier.sqlite3")
+FRONTIER_MAX_ATTEMPTS = getattr(CONFIG, "FRONTIER_MAX_ATTEMPTS", 3)
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class Frontier(SqliteStore):
+    schema = (
+        "CREATE TABLE IF NOT EXISTS cursors ("
+        "kind TEXT PRIMARY KEY, page INTEGER NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS pages ("
+        "kind TEXT NOT NULL, page INTEGER NOT NULL, state TEXT NOT NULL, "
+        "attempts INTEGER NOT NULL DEFAULT 0, error TEXT NOT NULL DEFAULT '', "
+        "updated_at REAL NOT NULL, PRIMARY KEY (kind, page));"
+        "CREATE TABLE IF NOT EXISTS items ("
+        "kind TEXT NOT NULL, page INTEGER NOT NULL, slug TEXT NOT NULL, "
+        "state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+        "error TEXT NOT NULL DEFAULT '', updated_at REAL NOT NULL, "
+        "PRIMARY KEY (kind, page, slug));"
+    )
+
+    def __init__(
+        self, path: str = FRONTIER_DB, max_attempts: int = FRONTIER_MAX_ATTEMPTS
+    ):
+        super().__init__(path)
+        self.max_attempts = max_attempts
+
+    def write(self, query: str, data: tuple = (), is_bulk: bool = False):
+        with self._lock:
+            conn = self.get_conn()
+            if is_bulk:
+                conn.executemany(query, data)
+            else:
+                conn.execute(query, data)
+            conn.commit()
+
+    def read(self, query: str, data: tuple = ()) -> list:
+        with self._lock:
+            return self.get_conn().execute(query, data).fetchall()
+
+    def recover(self, kind: str):
+        # Whatever was in flight when the last run of this loop died starts over
+        for table in ["pages", "items"]:
+            self.write(
+                f"UPDATE {table} SET state=? WHERE kind=? AND state=?",
+                (PENDING, kind, IN_FLIGHT),
+            )
+
+        pending = self.read(
+            "SELECT page FROM pages WHERE kind=? AND state=?", (kind, PENDING)
+        )
+        if pending:
+            logging.info(
+                f"Frontier {kind}: resuming interrupted pages "
+                f"{', '.join(str(row[0]) for row in pending)}"
+            )
+
+    def get_cursor(self, kind: str, default: int = 1) -> int:
+        rows = self.read("SELECT page FROM cursors WHERE kind=?", (kind,))
+        return rows[0][0] if rows else default
+
+    def set_cursor(self, kind: str, page: int):
+        self.write("INSERT OR REPLACE INTO cursors VALUES (?, ?)", (kind, page))
+
+    def get_page(self, kind: str, page: int) -> tuple:
+        rows = self.read(
+            "SELECT state, attempts FROM pages WHERE kind=? AND page=?", (kind, page)
+        )
+        return rows[0] if rows else ("", 0)
+
+    def start_page(self, kind: str, page: int):
+        state, attempts = self.get_page(kind, page)
+        if state in ("", DONE) or attempts >= self.max_attempts:
+            # A fresh visit: forget the items of the previous one
+            self.write("DELETE FROM items WHERE kind=? AND page=?", (kind, page))
+            attempts = 0
+
+        self.write(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, '', ?)",
+            (kind, page, IN_FLIGHT, attempts + 1, time.time()),
+        )
+
+    def finish_page(self, kind: str, page: int):
+        self.write(
+            "UPDATE pages SET state=?, error='', updated_at=? WHERE kind=? AND page=?",
+            (DONE, time.time(), kind, page),
+        )
+
+    def fail_page(self, kind: str, page: int, error: str = ""):
+        self.write(
+            "UPDATE pages SET state=?, error=?, updated_at=? WHERE kind=? AND page=?",
+            (FAILED, error[:1000], time.time(), kind, page),
+        )
+
+    def page_attempts(self, kind: str, page: int) -> int:
+        return self.get_page(kind, page)[1]
+
+    def settled_slugs(self, kind: str, page: int) -> set:
+        rows = self.read(
+            "SELECT slug FROM items WHERE kind=? AND page=? "
+            "AND (state=? OR (state=? AND attempts>=?))",
+            (kind, page, DONE, FAILED, self.max_attempts),
+        )
+        return {row[0] for row in rows}
+
+    def start_items(self, kind: str, page: int, slugs: list):
+        now = time.time()
+        self.write(
+            "INSERT INTO items VALUES (?, ?, ?, ?, 1, '', ?) "
+            "ON CONFLICT (kind, page, slug) DO UPDATE SET "
+            "state=excluded.state, attempts=attempts+1, updated_at=excluded.updated_at",
+            [(kind, page, slug, IN_FLIGHT, now) for slug in slugs],
+            is_bulk=True,
+        )
+
+    def finish_item(self, kind: str, page: int, slug: str):
+        self.write(
+            "UPDATE items SET state=?, error='', updated_at=? "
+            "WHERE kind=? AND page=? AND slug=?",
+            (DONE, time.time(), kind, page, slug),
+        )
+
+    def fail_item(self, kind: str, page: int, slug: str, error: str = ""):
+        self.write(
+            "UPDATE items SET state=?, error=?, updated_at=? "
+            "WHERE kind=? AND page=? AND slug=?",
+            (FAILED, error[:1000], time.time(), kind, page, slug),
+        )
+
+
+frontier = Frontier()
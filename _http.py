@@ -0,0 +1,133 @@
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from _http_cache import http_cache
+from _metrics import metrics
+from _ratelimit import rate_limiter
+from settings import CONFIG
+
+HTTP_POOL_SIZE = getattr(CONFIG, "HTTP_POOL_SIZE", 10)
+HTTP_CONNECT_TIMEOUT = getattr(CONFIG, "HTTP_CONNECT_TIMEOUT", 10)
+HTTP_READ_TIMEOUT = getattr(CONFIG, "HTTP_READ_TIMEOUT", 30)
+HTTP_MAX_RETRIES = getattr(CONFIG, "HTTP_MAX_RETRIES", 4)
+HTTP_BACKOFF_BASE = getattr(CONFIG, "HTTP_BACKOFF_BASE", 1)
+HTTP_BACKOFF_MAX = getattr(CONFIG, "HTTP_BACKOFF_MAX", 60)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(retry_after: str):
+    if not retry_after:
+        return None
+
+    try:
+        return max(0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt: int, retry_after: str = "") -> float:
+    delay = parse_retry_after(retry_after)
+    if delay is not None:
+        return min(delay, HTTP_BACKOFF_MAX)
+
+    # Full jitter keeps several crawlers from retrying in lockstep
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2**attempt))
+
+
+def get_retry_delay(
+    url: str,
+    attempt: int,
+    status: int = None,
+    retry_after: str = "",
+    error: Exception = None,
+    max_retries: int = HTTP_MAX_RETRIES,
+):
+    # None when the response should be returned, or the error raised, as is
+    if attempt >= max_retries or (error is None and status not in RETRY_STATUSES):
+        return None
+
+    delay = retry_delay(attempt, retry_after)
+    reason = repr(error) if error is not None else f"HTTP {status}"
+    logging.warning(f"{reason} - retrying {url} in {delay:.1f}s")
+    metrics.inc("http_retries")
+
+    return delay
+
+
+class HttpClient:
+    def __init__(
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        timeout: tuple = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+        max_retries: int = HTTP_MAX_RETRIES,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, headers: dict = None) -> requests.Response:
+        entry, content, conditional_headers = http_cache.prepare(url)
+        if content is not None:
+            return http_cache.response(url, content)
+
+        response = self.fetch(url, headers={**(headers or {}), **conditional_headers})
+        content = http_cache.finish(
+            url, entry, response.status_code, response.headers, response.content
+        )
+        if content is None:
+            response = self.fetch(url, headers=headers)
+            http_cache.finish(
+                url, None, response.status_code, response.headers, response.content
+            )
+        elif response.status_code == 304:
+            return http_cache.response(url, content)
+
+        return response
+
+    def fetch(self, url: str, headers: dict = None) -> requests.Response:
+        attempt = 0
+        while True:
+            rate_limiter.acquire(url)
+            try:
+                with metrics.time("download"):
+                    response = self.session.get(
+                        url, headers=headers, timeout=self.timeout
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = get_retry_delay(
+                    url, attempt, error=e, max_retries=self.max_retries
+                )
+                if delay is None:
+                    raise
+            else:
+                delay = get_retry_delay(
+                    url,
+                    attempt,
+                    status=response.status_code,
+                    retry_after=response.headers.get("Retry-After"),
+                    max_retries=self.max_retries,
+                )
+                if delay is None:
+                    return response
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+
+http_client = HttpClient()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import requests
+
+from _metrics import metrics
+from _storage import atomic_write
+from settings import CONFIG
+
+HTTP_CACHE_ENABLED = getattr(CONFIG, "HTTP_CACHE_ENABLED", True)
+HTTP_CACHE_DIR = getattr(CONFIG, "HTTP_CACHE_DIR", "cache/http")
+HTTP_CACHE_MAX_AGE = {
+    "homepage": 0,
+    "listing": 0,
+    # Detail pages carry new episodes; always revalidate them with a conditional GET
+    "detail": 0,
+    **getattr(CONFIG, "HTTP_CACHE_MAX_AGE", {}),
+}
+
+
+class HttpCache:
+    def __init__(
+        self,
+        cache_dir: str = HTTP_CACHE_DIR,
+        max_age: dict = HTTP_CACHE_MAX_AGE,
+        enabled: bool = HTTP_CACHE_ENABLED,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age
+        self.enabled = enabled
+
+    def url_class(self, url: str) -> str:
+        if url.rstrip("/") == CONFIG.TINYZONETV_HOMEPAGE.rstrip("/"):
+            return "homepage"
+
+        for listing_page in [
+            CONFIG.TINYZONETV_MOVIES_PAGE,
+            CONFIG.TINYZONETV_TVSHOWS_PAGE,
+        ]:
+            if url.startswith(listing_page):
+                return "listing"
+
+        return "detail"
+
+    def get_path(self, url: str) -> Path:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / key[:2] / key
+
+    def load(self, url: str):
+        if not self.enabled:
+            return None
+
+        path = self.get_path(url)
+        try:
+            return json.loads(path.with_suffix(".json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def read_body(self, url: str):
+        try:
+            return self.get_path(url).with_suffix(".html").read_bytes()
+        except OSError:
+            return None
+
+    def is_fresh(self, url: str, entry: dict) -> bool:
+        max_age = self.max_age.get(self.url_class(url), 0)
+        return time.time() - entry["fetched_at"] < max_age
+
+    def conditional_headers(self, entry: dict) -> dict:
+        headers = {}
+        if not entry:
+            return headers
+
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        return headers
+
+    def prepare(self, url: str) -> tuple:
+        # (entry, fresh cached body or None, headers for a conditional GET)
+        entry = self.load(url)
+        if entry and self.is_fresh(url, entry):
+            content = self.read_body(url)
+            if content is not None:
+                metrics.inc("http_cache_hits")
+                return entry, content, {}
+
+        return entry, None, self.conditional_headers(entry)
+
+    def finish(self, url: str, entry: dict, status: int, headers, content: bytes):
+        # The body to use; None when a 304's cached body went missing and the page
+        # has to be downloaded again without conditional headers
+        if status == 304 and entry:
+            cached_content = self.read_body(url)
+            if cached_content is not None:
+                self.touch(url, entry)
+                metrics.inc("http_not_modified")
+            return cached_content
+
+        if status == 200:
+            self.store(url, headers, content)
+
+        return content
+
+    def store(self, url: str, headers, content: bytes):
+        if not self.enabled:
+            return
+
+        etag = headers.get("ETag", "")
+        last_modified = headers.get("Last-Modified", "")
+        if not (etag or last_modified or self.max_age.get(self.url_class(url), 0)):
+            return
+
+        path = self.get_path(url)
+        atomic_write(path.with_suffix(".html"), content)
+        self.touch(url, {"url": url, "etag": etag, "last_modified": last_modified})
+
+    def touch(self, url: str, entry: dict):
+        entry["fetched_at"] = time.time()
+        atomic_write(
+            self.get_path(url).with_suffix(".json"), json.dumps(entry).encode("utf-8")
+        )
+
+    def response(self, url: str, content: bytes):
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = content
+        response.headers["X-Cache"] = "HIT"
+
+        return response
+
+
+http_cache = HttpCache()
@@ -0,0 +1,185 @@
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from _storage import atomic_write
+from settings import CONFIG
+
+METRICS_NAMESPACE = getattr(CONFIG, "METRICS_NAMESPACE", "tinyzonetv")
+METRICS_TEXTFILE = getattr(CONFIG, "METRICS_TEXTFILE", "")
+METRICS_PORT = getattr(CONFIG, "METRICS_PORT", 0)
+# Every entry script runs on the same host; each serves on METRICS_PORT + its offset
+METRICS_PORT_OFFSETS = {
+    "movies_crawl": 0,
+    "tvseries_crawl": 1,
+    "update": 2,
+    "recount": 3,
+}
+METRICS_PORTS = getattr(CONFIG, "METRICS_PORTS", {})
+METRICS_REPORT_INTERVAL = getattr(CONFIG, "METRICS_REPORT_INTERVAL", 60)
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self, namespace: str = METRICS_NAMESPACE):
+        self.namespace = namespace
+        self.process = Path(sys.argv[0]).stem or "python"
+        self.counters = {}
+        self.histograms = {}
+        self.last_report = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+    @contextmanager
+    def time(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def render(self) -> str:
+        labels = f'process="{self.process}"'
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{self.namespace}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{{{labels}}} {value}")
+
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{self.namespace}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bucket, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{metric}_bucket{{{labels},le="{bucket}"}} {cumulative}'
+                    )
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = [
+                f"{name} n={h.count} avg={h.sum / h.count * 1000:.1f}ms "
+                f"p95<={h.quantile(0.95) * 1000:g}ms total={h.sum:.1f}s"
+                for name, h in sorted(self.histograms.items())
+                if h.count
+            ]
+            parts.extend(
+                f"{name}={value:g}" for name, value in sorted(self.counters.items())
+            )
+
+        return "; ".join(parts)
+
+    def write_textfile(self, path: str = METRICS_TEXTFILE):
+        atomic_write(path.format(process=self.process), self.render())
+
+    def serve(self, port: int = METRICS_PORT):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+
+    def get_port(self) -> int:
+        if self.process in METRICS_PORTS:
+            return METRICS_PORTS[self.process]
+        if not METRICS_PORT:
+            return 0
+        return METRICS_PORT + METRICS_PORT_OFFSETS.get(self.process, 0)
+
+    def start(self):
+        port = self.get_port()
+        if not port or self._server is not None:
+            return
+
+        try:
+            self.serve(port)
+        except OSError as e:
+            logging.error(f"Can't serve metrics on port {port}: {e}")
+
+    def maybe_report(self, interval: float = METRICS_REPORT_INTERVAL):
+        if time.monotonic() - self.last_report < interval:
+            return
+
+        self.last_report = time.monotonic()
+        logging.info(f"Metrics: {self.summary()}")
+        if METRICS_TEXTFILE:
+            self.write_textfile(METRICS_TEXTFILE)
+
+
+metrics = Metrics()
@@ -0,0 +1,69 @@
+import logging
+
+from _frontier import frontier
+from settings import CONFIG
+
+INCREMENTAL_CRAWL = getattr(CONFIG, "INCREMENTAL_CRAWL", False)
+INCREMENTAL_STOP_AFTER = getattr(CONFIG, "INCREMENTAL_STOP_AFTER", 3)
+# With INCREMENTAL_CRAWL, the full sweep advances one page every this many cycles
+FULL_SWEEP_EVERY = getattr(CONFIG, "FULL_SWEEP_EVERY", 10)
+
+
+class PageWalker:
+    def __init__(
+        self,
+        crawler,
+        kind: str,
+        url: str,
+        last_page: int,
+        post_type: str = CONFIG.TYPE_TV_SHOWS,
+        wrap_page: int = 1,
+        incremental: bool = False,
+        stop_after: int = INCREMENTAL_STOP_AFTER,
+    ):
+        self.crawler = crawler
+        self.kind = kind
+        self.url = url
+        self.last_page = last_page
+        self.post_type = post_type
+        self.wrap_page = wrap_page
+        self.incremental = incremental
+        self.stop_after = stop_after
+        self.unchanged_pages = 0
+
+        frontier.recover(kind)
+        self.page = frontier.get_cursor(kind)
+
+    def step(self) -> int:
+        self.crawler.page_changes = 0
+        try:
+            crawled_page = self.crawler.crawl_page(
+                f"{self.url}?page={self.page}",
+                post_type=self.post_type,
+                frontier_page=(self.kind, self.page),
+                incremental=self.incremental,
+            )
+            if crawled_page and self.incremental:
+                self.unchanged_pages = (
+                    0 if self.crawler.page_changes else self.unchanged_pages + 1
+                )
+
+            if self.unchanged_pages >= self.stop_after:
+                logging.info(
+                    f"{self.kind}: {self.unchanged_pages} pages without changes, "
+                    f"back to page {self.wrap_page}"
+                )
+                self.page = self.wrap_page
+                self.unchanged_pages = 0
+            elif not crawled_page and self.page >= self.last_page:
+                self.page = self.wrap_page
+                self.unchanged_pages = 0
+            else:
+                self.page += 1
+        except Exception as e:
+            if frontier.page_attempts(self.kind, self.page) >= frontier.max_attempts:
+                self.page += 1
+        frontier.set_cursor(self.kind, self.page)
+
+        # The listing page itself plus the detail pages it led to
+        return 1 + self.crawler.page_changes
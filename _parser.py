@@ -0,0 +1,67 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from _metrics import metrics
+from settings import CONFIG
+
+PARSER_BACKEND = getattr(CONFIG, "PARSER_BACKEND", "html.parser")
+PARSER_BACKENDS = ("html.parser", "lxml", "lexbor")
+
+
+class LexborNode:
+    def __init__(self, node):
+        self.node = node
+
+    def __str__(self) -> str:
+        return self.node.html or ""
+
+    def get_selector(self, name=None, attrs=None, class_=None) -> str:
+        selector = name or "*"
+        if class_:
+            selector += f".{class_}"
+        for key, value in (attrs or {}).items():
+            selector += f'[{key}="{value}"]'
+
+        return selector
+
+    def find(self, name=None, attrs=None, class_=None):
+        node = self.node.css_first(self.get_selector(name, attrs, class_))
+        return LexborNode(node) if node is not None else None
+
+    def find_all(self, name=None, attrs=None, class_=None) -> list:
+        return [
+            LexborNode(node)
+            for node in self.node.css(self.get_selector(name, attrs, class_))
+        ]
+
+    def get(self, key: str, default=None):
+        value = self.node.attributes.get(key)
+        return value if value is not None else default
+
+    @property
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+
+def parse_html(content: bytes, backend: str = PARSER_BACKEND, only: tuple = None):
+    if backend in ("html.parser", "lxml"):
+        # Only build the (name, class) subtrees the caller reads. The strainer sees
+        # the raw class attribute, so match the class as a word inside it.
+        parse_only = (
+            SoupStrainer(
+                only[0], class_=re.compile(rf"(^|\s){re.escape(only[1])}(\s|$)")
+            )
+            if only
+            else None
+        )
+        with metrics.time("parse"):
+            return BeautifulSoup(content, backend, parse_only=parse_only)
+
+    if backend == "lexbor":
+        from selectolax.lexbor import LexborHTMLParser
+
+        with metrics.time("parse"):
+            return LexborNode(LexborHTMLParser(content).root)
+
+    raise ValueError(f"Unknown parser backend: {backend}")
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+
+from _metrics import metrics
+from _storage import atomic_write
+from settings import CONFIG
+
+POLL_MIN_INTERVAL = getattr(CONFIG, "POLL_MIN_INTERVAL", 60)
+POLL_MAX_INTERVAL = getattr(CONFIG, "POLL_MAX_INTERVAL", 1800)
+POLL_BACKOFF = getattr(CONFIG, "POLL_BACKOFF", 2)
+POLL_STATS_FILE = getattr(CONFIG, "POLL_STATS_FILE", "cache/poll_stats.json")
+
+# Once an hour slot has seen this much polling, halve it so old weeks fade out
+POLL_STATS_WINDOW = 30 * 3600
+
+
+def homepage_digest(items: list) -> str:
+    payload = json.dumps(
+        [(item["slug"], item["fd_infor"], item["quality"]) for item in items]
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class AdaptivePoller:
+    def __init__(
+        self,
+        interval: float = CONFIG.WAIT_BETWEEN_LATEST,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        backoff: float = POLL_BACKOFF,
+        stats_file: str = POLL_STATS_FILE,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self.clamp(interval)
+        self.backoff = backoff
+        self.stats_file = stats_file
+        self.digest = ""
+        # Per hour of day: [seconds watched, changes seen]
+        self.hours = {str(hour): [0.0, 0] for hour in range(24)}
+        self.last_poll = None
+        self.load()
+
+    def clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def load(self):
+        if not self.stats_file or not Path(self.stats_file).exists():
+            return
+
+        try:
+            stats = json.loads(Path(self.stats_file).read_text())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable poll stats {self.stats_file}: {e}")
+            return
+
+        self.digest = stats.get("digest", "")
+        self.hours.update(stats.get("hours", {}))
+
+    def save(self):
+        if not self.stats_file:
+            return
+
+        atomic_write(
+            self.stats_file, json.dumps({"digest": self.digest, "hours": self.hours})
+        )
+
+    def hour_cap(self, hour: int) -> float:
+        seconds, changes = self.hours[str(hour)]
+        if not changes:
+            return self.max_interval
+
+        # Poll about twice per expected change; one quiet hour is the prior
+        return (seconds + 3600) / changes / 2
+
+    def observe(self, items: list) -> bool:
+        now = time.time()
+        hour = self.hours[str(datetime.now().hour)]
+        if self.last_poll is not None:
+            hour[0] += now - self.last_poll
+        self.last_poll = now
+
+        if items is None:
+            # A failed poll says nothing about the homepage; keep the interval
+            return False
+
+        metrics.inc("homepage_polls")
+        digest = homepage_digest(items)
+        changed = bool(self.digest) and digest != self.digest
+        self.digest = digest
+
+        if changed:
+            metrics.inc("homepage_changes")
+            hour[1] += 1
+            self.interval = self.interval / self.backoff
+        else:
+            self.interval = self.interval * self.backoff
+
+        if hour[0] > POLL_STATS_WINDOW:
+            hour[0], hour[1] = hour[0] / 2, hour[1] / 2
+
+        next_hour = datetime.fromtimestamp(now + self.interval).hour
+        self.interval = self.clamp(min(self.interval, self.hour_cap(next_hour)))
+        self.save()
+
+        logging.info(
+            f"Homepage {'changed' if changed else 'unchanged'}, "
+            f"next poll in {self.interval:.0f}s"
+        )
+
+        return changed
@@ -0,0 +1,40 @@
+import time
+
+from _db import database
+from settings import CONFIG
+
+POSTMETA_CHUNK_ROWS = getattr(CONFIG, "POSTMETA_CHUNK_ROWS", 500)
+# Optional pause between chunks, for databases that need writes spread out
+POSTMETA_THROTTLE = getattr(CONFIG, "POSTMETA_THROTTLE", 0)
+# Replays overwrite meta_value instead of adding rows, given a unique key on
+# (post_id, meta_key). Without one this is a plain INSERT.
+POSTMETA_UPSERT = getattr(CONFIG, "POSTMETA_UPSERT", True)
+
+
+class PostmetaWriter:
+    def __init__(
+        self,
+        chunk_rows: int = POSTMETA_CHUNK_ROWS,
+        throttle: float = POSTMETA_THROTTLE,
+        upsert: bool = POSTMETA_UPSERT,
+    ):
+        self.chunk_rows = chunk_rows
+        self.throttle = throttle
+        self.upsert = upsert
+
+    def write(self, rows: list, table: str = "postmeta"):
+        rows = list(rows)
+        with database.session():
+            for start in range(0, len(rows), self.chunk_rows):
+                if start and self.throttle:
+                    time.sleep(self.throttle)
+                database.insert_into(
+                    table=f"{CONFIG.TABLE_PREFIX}{table}",
+                    data=rows[start : start + self.chunk_rows],
+                    is_bulk=True,
+                    on_duplicate="update" if self.upsert else None,
+                    update_columns=("meta_value",),
+                )
+
+
+postmeta_writer = PostmetaWriter()
@@ -0,0 +1,76 @@
+import logging
+import threading
+
+from _db import database
+from settings import CONFIG
+
+POST_INDEX_POST_TYPES = (
+    CONFIG.TYPE_TV_SHOWS,
+    CONFIG.TYPE_MOVIE,
+    "seasons",
+    "episodes",
+)
+
+
+class PostIndex:
+    def __init__(self):
+        self.is_loaded = False
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _in_post_types(self) -> str:
+        return ", ".join(f"'{post_type}'" for post_type in POST_INDEX_POST_TYPES)
+
+    def load(self):
+        table = f"{CONFIG.TABLE_PREFIX}posts"
+        condition = f"post_type IN ({self._in_post_types()})"
+
+        ids = {}
+        for post_type, post_name, post_id in database.iter_with(
+            f"SELECT post_type, post_name, ID FROM {table} WHERE {condition}"
+        ):
+            ids.setdefault((post_type, post_name), post_id)
+        with self._lock:
+            self._ids = ids
+
+        self.is_loaded = True
+        logging.info(f"Loaded post index for {table}")
+
+    def select_id(self, post_type: str, post_name: str):
+        condition = f"post_name = '{post_name}' AND post_type='{post_type}' LIMIT 1"
+        be_post = database.select_all_from(
+            table=f"{CONFIG.TABLE_PREFIX}posts", condition=condition, cols="ID"
+        )
+        return be_post[0][0] if be_post else None
+
+    def get_id(self, post_type: str, post_name: str):
+        if not self.is_loaded:
+            with self._load_lock:
+                if not self.is_loaded:
+                    self.load()
+
+        post_id = self._ids.get((post_type, post_name))
+        if post_id is not None:
+            return post_id
+
+        # Misses are confirmed so posts inserted by the other crawler processes are seen
+        post_id = self.select_id(post_type, post_name)
+        if post_id is not None:
+            self._ids[(post_type, post_name)] = post_id
+        return post_id
+
+    def add(self, post_type: str, post_name: str, post_id: int):
+        if not self.is_loaded or post_type not in POST_INDEX_POST_TYPES:
+            return
+
+        with self._lock:
+            self._ids[(post_type, post_name)] = post_id
+        database.on_rollback(lambda: self.discard(post_type, post_name))
+
+    def discard(self, post_type: str, post_name: str):
+        with self._lock:
+            self._ids.pop((post_type, post_name), None)
+
+
+post_index = PostIndex()
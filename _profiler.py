@@ -0,0 +1,177 @@
+import atexit
+import logging
+import re
+import signal
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+from settings import CONFIG
+
+DB_PROFILE = getattr(CONFIG, "DB_PROFILE", False)
+DB_PROFILE_SLOW_MS = getattr(CONFIG, "DB_PROFILE_SLOW_MS", 200)
+DB_PROFILE_SLOW_LOG = getattr(CONFIG, "DB_PROFILE_SLOW_LOG", "slow_queries.log")
+DB_PROFILE_TOP = getattr(CONFIG, "DB_PROFILE_TOP", 20)
+DB_PROFILE_SAMPLES = getattr(CONFIG, "DB_PROFILE_SAMPLES", 1000)
+
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+REPEATED_GROUPS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+@lru_cache(maxsize=4096)
+def normalize(query: str) -> str:
+    shape = STRING_LITERAL.sub("?", query)
+    shape = shape.replace("%s", "?")
+    shape = NUMBER_LITERAL.sub("?", shape)
+    # IN (?, ?, ?) and multi-row VALUES lists collapse to one shape
+    shape = PLACEHOLDER_LIST.sub("(...)", shape)
+    shape = REPEATED_GROUPS.sub("(...), ...", shape)
+
+    return " ".join(shape.split())
+
+
+class QueryStats:
+    def __init__(self, samples: int = DB_PROFILE_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=samples)
+
+    def add(self, seconds: float, rows: int):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.durations.append(seconds)
+
+    def p95(self) -> float:
+        durations = sorted(self.durations)
+        return durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+
+
+class ProfiledCursor:
+    def __init__(self, cur, query: str, profiler):
+        self.cur = cur
+        self.query = query
+        self.profiler = profiler
+        self.seconds = 0.0
+        self.rows = 0
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def execute(self, query: str, data=None):
+        self._timed(self.cur.execute, query, data)
+        self.rows = max(0, self.cur.rowcount)
+
+    def executemany(self, query: str, data):
+        self._timed(self.cur.executemany, query, data)
+        self.rows = max(0, self.cur.rowcount)
+
+    def fetchall(self) -> list:
+        rows = self._timed(self.cur.fetchall)
+        self.rows = len(rows)
+        return rows
+
+    def fetchmany(self, size: int) -> list:
+        rows = self._timed(self.cur.fetchmany, size)
+        self.rows += len(rows)
+        return rows
+
+    def close(self):
+        self.profiler.record(self.query, self.seconds, self.rows)
+        self.cur.close()
+
+    def __getattr__(self, name):
+        return getattr(self.cur, name)
+
+
+class QueryProfiler:
+    def __init__(
+        self,
+        enabled: bool = DB_PROFILE,
+        slow_ms: float = DB_PROFILE_SLOW_MS,
+        slow_log: str = DB_PROFILE_SLOW_LOG,
+    ):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.stats = {}
+        # Reentrant: the SIGUSR1 dump can interrupt record() on the main thread
+        self._lock = threading.RLock()
+        self._slow_logger = None
+
+    def cursor(self, cur, query: str):
+        return ProfiledCursor(cur, query, self) if self.enabled else cur
+
+    def get_slow_logger(self) -> logging.Logger:
+        if self._slow_logger is None:
+            Path("log").mkdir(parents=True, exist_ok=True)
+            handler = logging.FileHandler(f"log/{self.slow_log}")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger = logging.getLogger("tinyzonetv.slow_queries")
+            logger.addHandler(handler)
+            logger.propagate = False
+            self._slow_logger = logger
+
+        return self._slow_logger
+
+    def record(self, query: str, seconds: float, rows: int):
+        shape = normalize(query)
+        with self._lock:
+            if shape not in self.stats:
+                self.stats[shape] = QueryStats()
+            self.stats[shape].add(seconds, rows)
+
+        if seconds * 1000 >= self.slow_ms:
+            self.get_slow_logger().warning(
+                f"{seconds * 1000:.1f}ms rows={rows} {' '.join(query.split())[:1000]}"
+            )
+
+    def report(self, top: int = DB_PROFILE_TOP) -> str:
+        with self._lock:
+            ranked = sorted(self.stats.items(), key=lambda kv: -kv[1].total)[:top]
+            count = sum(stats.count for stats in self.stats.values())
+            total = sum(stats.total for stats in self.stats.values())
+
+        lines = [
+            f"Query profile: {count} statements, {total:.2f}s, "
+            f"{len(self.stats)} shapes (top {len(ranked)} by total time)",
+            f"{'count':>8} {'total s':>9} {'avg ms':>8} {'p95 ms':>8} "
+            f"{'max ms':>8} {'rows':>9}  shape",
+        ]
+        for shape, stats in ranked:
+            lines.append(
+                f"{stats.count:>8} {stats.total:>9.3f} "
+                f"{stats.total / stats.count * 1000:>8.2f} "
+                f"{stats.p95() * 1000:>8.2f} {stats.max * 1000:>8.2f} "
+                f"{stats.rows:>9}  {shape[:160]}"
+            )
+
+        return "\n".join(lines)
+
+    def dump(self, *args):
+        if self.stats:
+            logging.info(self.report())
+
+    def install(self):
+        atexit.register(self.dump)
+        # Signal handlers can only be set from the main thread
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is (
+            threading.main_thread()
+        ):
+            signal.signal(signal.SIGUSR1, self.dump)
+
+
+query_profiler = QueryProfiler()
+if query_profiler.enabled:
+    query_profiler.install()
@@ -0,0 +1,71 @@
+import fcntl
+import os
+import struct
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from _metrics import metrics
+from settings import CONFIG
+
+RATE_LIMIT_PER_SECOND = getattr(CONFIG, "RATE_LIMIT_PER_SECOND", 0)
+RATE_LIMIT_BURST = getattr(CONFIG, "RATE_LIMIT_BURST", 5)
+RATE_LIMIT_HOSTS = getattr(CONFIG, "RATE_LIMIT_HOSTS", {})
+RATE_LIMIT_DIR = getattr(CONFIG, "RATE_LIMIT_DIR", "cache/ratelimit")
+
+# tokens, updated_at
+BUCKET = struct.Struct("dd")
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: float = RATE_LIMIT_BURST,
+        hosts: dict = RATE_LIMIT_HOSTS,
+        directory: str = RATE_LIMIT_DIR,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.hosts = hosts
+        self.directory = directory
+
+    def get_rate(self, host: str) -> float:
+        return self.hosts.get(host, self.rate)
+
+    def reserve(self, url: str) -> float:
+        host = urlsplit(url).hostname or "default"
+        rate = self.get_rate(host)
+        if not rate:
+            return 0
+
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        fd = os.open(f"{self.directory}/{host}.bucket", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # One bucket per host, shared by every crawler process on this machine
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, BUCKET.size, 0)
+            now = time.time()
+            tokens, updated_at = (
+                BUCKET.unpack(data) if len(data) == BUCKET.size else (self.burst, now)
+            )
+            tokens = min(self.burst, tokens + max(0, now - updated_at) * rate) - 1
+            os.pwrite(fd, BUCKET.pack(tokens, now), 0)
+        finally:
+            os.close(fd)
+
+        # A negative balance is a place in the queue behind earlier reservations
+        wait = -tokens / rate if tokens < 0 else 0
+        if wait:
+            metrics.inc("rate_limit_throttled")
+            metrics.observe("rate_limit_wait", wait)
+
+        return wait
+
+    def acquire(self, url: str):
+        wait = self.reserve(url)
+        if wait:
+            time.sleep(wait)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,151 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+from _db import database
+from _metrics import metrics
+from _storage import atomic_write
+from settings import CONFIG
+
+RECOUNT_STATE_FILE = getattr(CONFIG, "RECOUNT_STATE_FILE", "cache/recount.json")
+RECOUNT_CHUNK_SIZE = getattr(CONFIG, "RECOUNT_CHUNK_SIZE", 1000)
+# Ids below the watermark rescanned on every run. A film's root post gets its terms
+# first but commits only after all its seasons and episodes, so other films can
+# commit past it in the meantime; this covers the post ids of the longest show.
+RECOUNT_OVERLAP = getattr(CONFIG, "RECOUNT_OVERLAP", 5000)
+RECOUNT_INTERVAL = getattr(CONFIG, "RECOUNT_INTERVAL", 300)
+RECOUNT_FULL_EVERY = getattr(CONFIG, "RECOUNT_FULL_EVERY", 24)
+
+
+def placeholders(values) -> str:
+    return ", ".join(["%s"] * len(values))
+
+
+class TermRecounter:
+    def __init__(
+        self,
+        path: str = RECOUNT_STATE_FILE,
+        chunk_size: int = RECOUNT_CHUNK_SIZE,
+        overlap: int = RECOUNT_OVERLAP,
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.state = self.load()
+
+    def load(self) -> dict:
+        try:
+            return json.loads(Path(self.path).read_text())
+        except (OSError, ValueError):
+            return {"watermarks": {}, "runs": 0}
+
+    def save(self):
+        atomic_write(self.path, json.dumps(self.state))
+
+    def max_object_id(self, session) -> int:
+        rows = session.select_with(
+            f"SELECT MAX(object_id) FROM {CONFIG.TABLE_PREFIX}term_relationships"
+        )
+        return rows[0][0] or 0
+
+    def iter_all(self, session, taxonomy: str = ""):
+        last_id = 0
+        while True:
+            rows = session.select_with(
+                f"SELECT term_taxonomy_id FROM {CONFIG.TABLE_PREFIX}term_taxonomy "
+                f"WHERE term_taxonomy_id > %s {'AND taxonomy = %s' if taxonomy else ''} "
+                f"ORDER BY term_taxonomy_id LIMIT {self.chunk_size}",
+                (last_id, taxonomy) if taxonomy else (last_id,),
+            )
+            if not rows:
+                return
+            yield [row[0] for row in rows]
+            last_id = rows[-1][0]
+
+    def iter_touched(self, session, since: int, until: int):
+        rows = session.select_with(
+            f"SELECT DISTINCT term_taxonomy_id "
+            f"FROM {CONFIG.TABLE_PREFIX}term_relationships "
+            f"WHERE object_id > %s AND object_id <= %s",
+            (since, until),
+        )
+        ids = sorted(row[0] for row in rows)
+        for i in range(0, len(ids), self.chunk_size):
+            yield ids[i : i + self.chunk_size]
+
+    def recount(self, session, ids: list, taxonomy: str = "") -> int:
+        current = dict(
+            session.select_with(
+                f"SELECT term_taxonomy_id, count FROM {CONFIG.TABLE_PREFIX}term_taxonomy "
+                f"WHERE term_taxonomy_id IN ({placeholders(ids)}) "
+                f"{'AND taxonomy = %s' if taxonomy else ''}",
+                (*ids, taxonomy) if taxonomy else tuple(ids),
+            )
+        )
+        if not current:
+            return 0
+
+        counts = dict(
+            session.select_with(
+                f"SELECT tr.term_taxonomy_id, COUNT(*) "
+                f"FROM {CONFIG.TABLE_PREFIX}term_relationships tr, {CONFIG.TABLE_PREFIX}posts p "
+                f"WHERE tr.object_id = p.ID AND p.post_status = 'publish' "
+                f"AND tr.term_taxonomy_id IN ({placeholders(current)}) "
+                f"GROUP BY tr.term_taxonomy_id",
+                tuple(current),
+            )
+        )
+        # Rows already right are left alone, so a sweep only locks what it fixes
+        changed = {
+            term_taxonomy_id: counts.get(term_taxonomy_id, 0)
+            for term_taxonomy_id, count in current.items()
+            if count != counts.get(term_taxonomy_id, 0)
+        }
+        if not changed:
+            return 0
+
+        session.update_table(
+            table=f"{CONFIG.TABLE_PREFIX}term_taxonomy",
+            set_cond=f"count = CASE term_taxonomy_id "
+            f"{'WHEN %s THEN %s ' * len(changed)}END",
+            where_cond=f"term_taxonomy_id IN ({placeholders(changed)})",
+            data=(*[v for item in changed.items() for v in item], *changed),
+        )
+        return len(changed)
+
+    def run(self, full: bool = False, taxonomy: str = "") -> int:
+        started = time.monotonic()
+        watermarks = self.state.setdefault("watermarks", {})
+        full = full or taxonomy not in watermarks
+        updated = 0
+        with database.session() as s:
+            until = self.max_object_id(s)
+            chunks = (
+                self.iter_all(s, taxonomy)
+                if full
+                else self.iter_touched(
+                    s, max(0, watermarks[taxonomy] - self.overlap), until
+                )
+            )
+            for ids in chunks:
+                # Each chunk commits on its own so crawler writes never queue behind the job
+                updated += self.recount(s, ids, taxonomy)
+
+        watermarks[taxonomy] = until
+        self.state["runs"] = self.state.get("runs", 0) + 1
+        self.save()
+
+        metrics.inc("term_counts_updated", updated)
+        logging.info(
+            f"Recounted {'all' if full else 'touched'} "
+            f"{taxonomy or 'taxonomies'}: {updated} counts updated "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return updated
+
+    def is_full_due(self, full_every: int = RECOUNT_FULL_EVERY) -> bool:
+        return bool(full_every) and self.state.get("runs", 0) % full_every == 0
+
+
+term_recounter = TermRecounter()
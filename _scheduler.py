@@ -0,0 +1,153 @@
+import json
+import time
+
+from _storage import SqliteStore
+from settings import CONFIG
+
+SCHEDULER_DB = getattr(CONFIG, "SCHEDULER_DB", "cache/schedule.sqlite3")
+SCHEDULER_MIN_INTERVAL = getattr(CONFIG, "SCHEDULER_MIN_INTERVAL", 3600)
+SCHEDULER_MAX_INTERVAL = getattr(CONFIG, "SCHEDULER_MAX_INTERVAL", 30 * 86400)
+SCHEDULER_CHECKS_PER_CHANGE = getattr(CONFIG, "SCHEDULER_CHECKS_PER_CHANGE", 6)
+SCHEDULER_BUDGET = getattr(CONFIG, "SCHEDULER_BUDGET", 66)
+SCHEDULER_HOT_SHARE = getattr(CONFIG, "SCHEDULER_HOT_SHARE", 0.5)
+SCHEDULER_PAGE_COST = getattr(CONFIG, "SCHEDULER_PAGE_COST", 33)
+
+
+def count_episodes(episodes_data: dict) -> int:
+    return sum(len(v) for v in episodes_data.values() if isinstance(v, dict))
+
+
+class RequestBudget:
+    def __init__(
+        self,
+        per_cycle: int = SCHEDULER_BUDGET,
+        hot_share: float = SCHEDULER_HOT_SHARE,
+    ):
+        self.per_cycle = per_cycle
+        self.hot_share = hot_share
+        self.tokens = 0
+
+    def refill(self):
+        # Unspent requests carry over, but only for about one extra cycle
+        self.tokens = min(self.tokens + self.per_cycle, 2 * self.per_cycle)
+
+    def hot_allowance(self) -> int:
+        return int(self.tokens * self.hot_share)
+
+    def spend(self, requests: int):
+        self.tokens -= requests
+
+
+class Scheduler(SqliteStore):
+    schema = (
+        "CREATE TABLE IF NOT EXISTS shows ("
+        "post_type TEXT NOT NULL, slug TEXT NOT NULL, item TEXT NOT NULL, "
+        "episodes INTEGER NOT NULL DEFAULT -1, last_changed REAL NOT NULL, "
+        "cadence REAL NOT NULL DEFAULT 0, next_due REAL NOT NULL, "
+        "PRIMARY KEY (post_type, slug));"
+        "CREATE INDEX IF NOT EXISTS shows_next_due "
+        "ON shows (post_type, next_due);"
+    )
+
+    def __init__(self, path: str = SCHEDULER_DB):
+        super().__init__(path)
+
+    def get_interval(self, last_changed: float, cadence: float, now: float) -> float:
+        since_change = now - last_changed
+        if cadence and since_change < 3 * cadence:
+            interval = cadence / SCHEDULER_CHECKS_PER_CHANGE
+        else:
+            # No rhythm (yet), or the show went quiet: back off with its age
+            interval = since_change / 2
+
+        return min(SCHEDULER_MAX_INTERVAL, max(SCHEDULER_MIN_INTERVAL, interval))
+
+    def track(self, items: list, post_type: str, is_latest: bool = False):
+        now = time.time()
+        # The homepage's latest sections just changed; a listing page says nothing
+        # about when a show last did, so it starts unknown (0) and waits the longest
+        last_changed = now if is_latest else 0
+        next_due = now + self.get_interval(last_changed, 0, now)
+        with self._lock:
+            conn = self.get_conn()
+            conn.executemany(
+                "INSERT INTO shows (post_type, slug, item, last_changed, next_due) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (post_type, slug) "
+                "DO UPDATE SET item=excluded.item",
+                [
+                    (
+                        post_type,
+                        item["slug"],
+                        json.dumps(item),
+                        last_changed,
+                        next_due,
+                    )
+                    for item in items
+                ],
+            )
+            conn.commit()
+
+    def observe(self, post_type: str, slug: str, episodes_data: dict) -> bool:
+        now = time.time()
+        episodes = count_episodes(episodes_data)
+        with self._lock:
+            conn = self.get_conn()
+            row = conn.execute(
+                "SELECT episodes, last_changed, cadence FROM shows "
+                "WHERE post_type=? AND slug=?",
+                (post_type, slug),
+            ).fetchone()
+            if not row:
+                return False
+
+            known_episodes, last_changed, cadence = row
+            # An empty parse is a failed season list, not a show that lost episodes
+            episodes = episodes or known_episodes
+            changed = 0 <= known_episodes < episodes
+            if changed:
+                if last_changed:
+                    gap = now - last_changed
+                    cadence = gap if not cadence else (cadence + gap) / 2
+                last_changed = now
+
+            conn.execute(
+                "UPDATE shows SET episodes=?, last_changed=?, cadence=?, next_due=? "
+                "WHERE post_type=? AND slug=?",
+                (
+                    episodes,
+                    last_changed,
+                    cadence,
+                    now + self.get_interval(last_changed, cadence, now),
+                    post_type,
+                    slug,
+                ),
+            )
+            conn.commit()
+
+        return changed
+
+    def due(self, post_type: str, limit: int) -> list:
+        if limit <= 0:
+            return []
+
+        now = time.time()
+        with self._lock:
+            conn = self.get_conn()
+            # Shows with a rhythm and recent episodes first, not the most overdue
+            rows = conn.execute(
+                "SELECT slug, item FROM shows WHERE post_type=? AND next_due<=? "
+                "ORDER BY cadence > 0 DESC, last_changed DESC, next_due LIMIT ?",
+                (post_type, now, limit),
+            ).fetchall()
+            # Push them back until observe() reschedules them, so a show that
+            # keeps failing doesn't hold the front of the queue
+            conn.executemany(
+                "UPDATE shows SET next_due=? WHERE post_type=? AND slug=?",
+                [(now + SCHEDULER_MIN_INTERVAL, post_type, row[0]) for row in rows],
+            )
+            conn.commit()
+
+        return [json.loads(row[1]) for row in rows]
+
+
+scheduler = Scheduler()
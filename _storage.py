@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+
+def atomic_write(path, content):
+    # Readers in other processes see either the old file or the new one, never half
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    if isinstance(content, str):
+        tmp_path.write_text(content)
+    else:
+        tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+class SqliteStore:
+    schema = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # WAL lets the other crawler processes read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.schema)
+            self._conn.commit()
+
+        return self._conn
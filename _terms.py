@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+
+from slugify import slugify
+
+from _db import database
+from settings import CONFIG
+
+TERM_CACHE_SIZE = getattr(CONFIG, "TERM_CACHE_SIZE", 50000)
+
+
+class TermResolver:
+    def __init__(self, max_size: int = TERM_CACHE_SIZE):
+        self.max_size = max_size
+        self.is_warm = False
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+
+    def get(self, taxonomy: str, slug: str):
+        key = (taxonomy, slug)
+        with self._lock:
+            ids = self._cache.get(key)
+            if ids is not None:
+                self._cache.move_to_end(key)
+            return ids
+
+    def put(self, taxonomy: str, slug: str, ids: tuple):
+        key = (taxonomy, slug)
+        with self._lock:
+            self._cache[key] = ids
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def discard(self, taxonomy: str, slug: str):
+        with self._lock:
+            self._cache.pop((taxonomy, slug), None)
+
+    def warm(self):
+        rows = database.select_with(
+            f"SELECT tt.taxonomy, t.slug, tt.term_taxonomy_id, tt.term_id "
+            f"FROM {CONFIG.TABLE_PREFIX}term_taxonomy tt, {CONFIG.TABLE_PREFIX}terms t "
+            f"WHERE tt.term_id=t.term_id "
+            f"ORDER BY tt.term_taxonomy_id DESC LIMIT {self.max_size}"
+        )
+        with self._lock:
+            # Newest rows come first; later duplicates of a slug must not override them
+            for taxonomy, slug, term_taxonomy_id, term_id in reversed(rows):
+                self._cache[(taxonomy, slug)] = (term_taxonomy_id, term_id)
+        self.is_warm = True
+
+    def lookup_many(self, keys: set) -> dict:
+        found = {}
+        if not keys:
+            return found
+
+        taxonomies = sorted({taxonomy for taxonomy, _ in keys})
+        slugs = sorted({slug for _, slug in keys})
+        rows = database.select_with(
+            f"SELECT tt.taxonomy, t.slug, tt.term_taxonomy_id, tt.term_id "
+            f"FROM {CONFIG.TABLE_PREFIX}term_taxonomy tt, {CONFIG.TABLE_PREFIX}terms t "
+            f"WHERE tt.term_id=t.term_id "
+            f"AND t.slug IN ({', '.join(['%s'] * len(slugs))}) "
+            f"AND tt.taxonomy IN ({', '.join(['%s'] * len(taxonomies))}) "
+            f"ORDER BY tt.term_taxonomy_id DESC",
+            (*slugs, *taxonomies),
+        )
+        # The IN lists cross every slug with every taxonomy; keep the asked pairs
+        for taxonomy, slug, term_taxonomy_id, term_id in rows:
+            key = (taxonomy, slug)
+            if key in keys and key not in found:
+                found[key] = (term_taxonomy_id, term_id)
+                self.put(taxonomy, slug, found[key])
+
+        return found
+
+    def resolve_many(self, terms: list) -> list:
+        if not self.is_warm:
+            with self._warm_lock:
+                if not self.is_warm:
+                    self.warm()
+
+        keys = [
+            (taxonomy, slug if slug else slugify(name))
+            for taxonomy, name, slug in terms
+        ]
+        resolved = {}
+        for key in keys:
+            ids = self.get(*key)
+            if ids is not None:
+                resolved[key] = (*ids, False)
+
+        found = self.lookup_many({key for key in keys if key not in resolved})
+        resolved.update({key: (*ids, False) for key, ids in found.items()})
+
+        # New terms are stored under the slug of their name
+        missing = {}
+        for key, (taxonomy, name, _) in zip(keys, terms):
+            if key not in resolved:
+                missing.setdefault((taxonomy, slugify(name)), name)
+
+        if missing:
+            term_ids = database.bulk_insert(
+                f"{CONFIG.TABLE_PREFIX}terms",
+                [(name, term_slug, 0) for (_, term_slug), name in missing.items()],
+                return_ids=True,
+            )
+            term_taxonomy_ids = database.bulk_insert(
+                f"{CONFIG.TABLE_PREFIX}term_taxonomy",
+                [
+                    (term_id, taxonomy, "", 0, 0)
+                    for (taxonomy, _), term_id in zip(missing, term_ids)
+                ],
+                return_ids=True,
+            )
+            for new_key, term_taxonomy_id, term_id in zip(
+                missing, term_taxonomy_ids, term_ids
+            ):
+                self.put(*new_key, (term_taxonomy_id, term_id))
+                database.on_rollback(lambda key=new_key: self.discard(*key))
+                resolved[new_key] = (term_taxonomy_id, term_id, True)
+
+        return [
+            resolved[key] if key in resolved else resolved[(taxonomy, slugify(name))]
+            for key, (taxonomy, name, _) in zip(keys, terms)
+        ]
+
+    def resolve(self, taxonomy: str, name: str, slug: str = "") -> tuple:
+        return self.resolve_many([(taxonomy, name, slug)])[0]
+
+
+term_resolver = TermResolver()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from _http import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, get_retry_delay
+from _http_cache import http_cache
+from _metrics import metrics
+from _parser import parse_html
+from _ratelimit import rate_limiter
+from base import Crawler
+from helper import helper
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+ASYNC_CONCURRENCY_PER_HOST = getattr(CONFIG, "ASYNC_CONCURRENCY_PER_HOST", 8)
+
+
+class AsyncCrawler(Crawler):
+    def __init__(self, concurrency_per_host: int = ASYNC_CONCURRENCY_PER_HOST):
+        self.concurrency_per_host = concurrency_per_host
+        # DB writes stay on one thread, in the order films finish parsing
+        self.writer = ThreadPoolExecutor(max_workers=1)
+
+    async def download(
+        self, session: aiohttp.ClientSession, url: str, headers: dict
+    ) -> tuple:
+        attempt = 0
+        while True:
+            wait = rate_limiter.reserve(url)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                start = time.perf_counter()
+                async with session.get(url, headers=headers) as response:
+                    delay = get_retry_delay(
+                        url,
+                        attempt,
+                        status=response.status,
+                        retry_after=response.headers.get("Retry-After"),
+                    )
+                    if delay is None:
+                        content = await response.read()
+                        metrics.observe("download", time.perf_counter() - start)
+                        return response.status, response.headers, content
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = get_retry_delay(url, attempt, error=e)
+                if delay is None:
+                    raise
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> bytes:
+        logging.info(f"Crawling {url}")
+
+        entry, content, conditional_headers = http_cache.prepare(url)
+        if content is not None:
+            return content
+
+        status, headers, content = await self.download(
+            session, url, headers={**helper.get_header(), **conditional_headers}
+        )
+        body = http_cache.finish(url, entry, status, headers, content)
+        if body is None:
+            status, headers, content = await self.download(
+                session, url, headers=helper.get_header()
+            )
+            body = http_cache.finish(url, None, status, headers, content)
+
+        return body
+
+    async def crawl_item_async(
+        self, session: aiohttp.ClientSession, item: dict, post_type: str
+    ):
+        loop = asyncio.get_running_loop()
+        try:
+            content = await self.fetch(session, item["href"])
+            film_data, episodes_data = await loop.run_in_executor(
+                None,
+                lambda: self.parse_film(
+                    soup=parse_html(content),
+                    **item,
+                    post_type=post_type,
+                ),
+            )
+            await loop.run_in_executor(
+                self.writer, self.save_film, film_data, episodes_data
+            )
+        except Exception as e:
+            self.fail_item(item["slug"], e)
+            helper.error_log(
+                msg=f"Error crawl_flw_item\n{e}", log_file="base.crawl_flw_item.log"
+            )
+
+    async def crawl_items_async(self, items: list, post_type: str):
+        connector = aiohttp.TCPConnector(limit_per_host=self.concurrency_per_host)
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT
+        )
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        ) as session:
+            await asyncio.gather(
+                *[self.crawl_item_async(session, item, post_type) for item in items]
+            )
+
+    def crawl_items(self, items: list, post_type: str = CONFIG.TYPE_TV_SHOWS):
+        asyncio.run(self.crawl_items_async(items, post_type))
+
+
+if __name__ == "__main__":
+    AsyncCrawler().crawl_page(url=CONFIG.TINYZONETV_TVSHOWS_PAGE + "?page=1")
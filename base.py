@@ -4,19 +4,35 @@ import sys
 
 from bs4 import BeautifulSoup
 
+from _fingerprints import fingerprint, fingerprint_store, listing_fingerprint
+from _frontier import frontier
+from _metrics import metrics
+from _parser import parse_html
+from _scheduler import scheduler
 from dootheme import Dootheme
 from helper import helper
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 
+LISTING_ONLY = ("div", "film_list-wrap")
+HOMEPAGE_ONLY = ("section", "block_area_home")
+
 
 class Crawler:
-    def crawl_soup(self, url):
+    # (kind, page) of the listing page being crawled, when a loop tracks it
+    frontier_page = None
+    # Listing card digests of the page being crawled, saved once a film is stored
+    listing_digests = None
+    listing_post_type = None
+    # Detail pages the last crawl_page went on to crawl
+    page_changes = 0
+
+    def crawl_soup(self, url, only: tuple = None):
         logging.info(f"Crawling {url}")
 
         html = helper.download_url(url)
-        soup = BeautifulSoup(html.content, "html.parser")
+        soup = parse_html(html.content, only=only)
 
         return soup
 
@@ -54,8 +70,9 @@ class Crawler:
 
         return res
 
-    def crawl_film(
+    def parse_film(
         self,
+        soup: BeautifulSoup,
         title: str,
         slug: str,
         fd_infor: list,
@@ -64,7 +81,6 @@ class Crawler:
         href: str,
         post_type: str = CONFIG.TYPE_TV_SHOWS,
     ):
-        soup = self.crawl_soup(href)
         detail_page_infor = soup.find("div", class_="detail_page-infor")
 
         title = (
@@ -108,64 +124,158 @@ class Crawler:
 
         return film_data, episodes_data
 
-    def crawl_flw_item(
-        self, flw_item: BeautifulSoup, post_type: str = CONFIG.TYPE_TV_SHOWS
+    def crawl_film(
+        self,
+        title: str,
+        slug: str,
+        fd_infor: list,
+        quality: str,
+        cover_src: str,
+        href: str,
+        post_type: str = CONFIG.TYPE_TV_SHOWS,
     ):
-        try:
-            film_poster = flw_item.find("div", class_="film-poster")
-            if film_poster:
-                film_poster_quality = film_poster.find(
-                    "div", class_="film-poster-quality"
+        soup = self.crawl_soup(href)
+
+        return self.parse_film(
+            soup=soup,
+            title=title,
+            slug=slug,
+            fd_infor=fd_infor,
+            quality=quality,
+            cover_src=cover_src,
+            href=href,
+            post_type=post_type,
+        )
+
+    def parse_flw_item(self, flw_item: BeautifulSoup) -> dict:
+        film_poster = flw_item.find("div", class_="film-poster")
+        if film_poster:
+            film_poster_quality = film_poster.find("div", class_="film-poster-quality")
+            quality = film_poster_quality.text if film_poster_quality else "HD"
+
+            img = film_poster.find("img")
+            cover_src = img.get("data-src") if img else ""
+
+            a_element = film_poster.find("a")
+            href = a_element.get("href") if a_element else ""
+
+        film_detail = flw_item.find("div", class_="film-detail")
+        if film_detail:
+            film_name = film_detail.find("h3", class_="film-name")
+            if film_name:
+                if film_name.find("a") and not href:
+                    href = film_name.find("a").get("href")
+                title = film_name.text.strip("\n")
+
+            fd_infor = film_detail.find("div", class_="fd-infor")
+            fd_infor = fd_infor.text if fd_infor else ""
+            fd_infor = [x for x in fd_infor.split("\n") if x]
+
+        if "http" not in href:
+            href = CONFIG.TINYZONETV_HOMEPAGE + href
+
+        slug = href.split("/")[-1]
+
+        return {
+            "title": title,
+            "slug": slug,
+            "fd_infor": fd_infor,
+            "quality": quality,
+            "cover_src": cover_src,
+            "href": href,
+        }
+
+    def parse_flw_items(self, flw_items: list) -> list:
+        items = []
+        for flw_item in flw_items:
+            try:
+                items.append(self.parse_flw_item(flw_item))
+            except Exception as e:
+                helper.error_log(
+                    msg=f"Error crawl_flw_item\n{e}", log_file="base.crawl_flw_item.log"
                 )
-                quality = film_poster_quality.text if film_poster_quality else "HD"
-
-                img = film_poster.find("img")
-                cover_src = img.get("data-src") if img else ""
-
-                a_element = film_poster.find("a")
-                href = a_element.get("href") if a_element else ""
-
-            film_detail = flw_item.find("div", class_="film-detail")
-            if film_detail:
-                film_name = film_detail.find("h3", class_="film-name")
-                if film_name:
-                    if film_name.find("a") and not href:
-                        href = film_name.find("a").get("href")
-                    title = film_name.text.strip("\n")
-
-                fd_infor = film_detail.find("div", class_="fd-infor")
-                fd_infor = fd_infor.text if fd_infor else ""
-                fd_infor = [x for x in fd_infor.split("\n") if x]
-
-            if "http" not in href:
-                href = CONFIG.TINYZONETV_HOMEPAGE + href
-
-            slug = href.split("/")[-1]
-
-            film_data, episodes_data = self.crawl_film(
-                title=title,
-                slug=slug,
-                fd_infor=fd_infor,
-                quality=quality,
-                cover_src=cover_src,
-                href=href,
-                post_type=post_type,
-            )
 
-            # film_data["episodes_data"] = episodes_data
+        return items
+
+    def save_film(self, film_data: dict, episodes_data: dict):
+        # film_data["episodes_data"] = episodes_data
 
-            # with open("json/crawled.json", "w") as f:
-            #     f.write(json.dumps(film_data, indent=4, ensure_ascii=False))
+        # with open("json/crawled.json", "w") as f:
+        #     f.write(json.dumps(film_data, indent=4, ensure_ascii=False))
 
+        post_type, slug = film_data["post_type"], film_data["slug"]
+        digest = fingerprint(film_data, episodes_data)
+        if fingerprint_store.is_unchanged(post_type, slug, digest):
+            metrics.inc("films_skipped")
+        else:
             Dootheme(film=film_data, episodes=episodes_data).insert_film()
-            # sys.exit(0)
+            fingerprint_store.put(post_type, slug, digest)
+            metrics.inc("films_written")
+
+        scheduler.observe(post_type, slug, episodes_data)
+        if self.listing_digests and slug in self.listing_digests:
+            fingerprint_store.put(
+                post_type, slug, self.listing_digests[slug], table="listings"
+            )
+        if self.frontier_page:
+            frontier.finish_item(*self.frontier_page, slug)
+
+    def fail_item(self, slug: str, error: Exception):
+        metrics.inc("crawl_errors")
+        if self.listing_digests and slug in self.listing_digests:
+            fingerprint_store.fail_listing(
+                self.listing_post_type, slug, self.listing_digests[slug]
+            )
+        if self.frontier_page:
+            frontier.fail_item(*self.frontier_page, slug, repr(error))
+
+    def crawl_item(self, item: dict, post_type: str = CONFIG.TYPE_TV_SHOWS):
+        try:
+            film_data, episodes_data = self.crawl_film(**item, post_type=post_type)
+            self.save_film(film_data, episodes_data)
         except Exception as e:
+            self.fail_item(item["slug"], e)
             helper.error_log(
                 msg=f"Error crawl_flw_item\n{e}", log_file="base.crawl_flw_item.log"
             )
 
-    def crawl_page(self, url, post_type: str = CONFIG.TYPE_TV_SHOWS):
-        soup = self.crawl_soup(url)
+    def crawl_items(self, items: list, post_type: str = CONFIG.TYPE_TV_SHOWS):
+        for item in items:
+            self.crawl_item(item=item, post_type=post_type)
+
+    def crawl_flw_item(
+        self, flw_item: BeautifulSoup, post_type: str = CONFIG.TYPE_TV_SHOWS
+    ):
+        self.crawl_items(self.parse_flw_items([flw_item]), post_type=post_type)
+
+    def crawl_page(
+        self,
+        url,
+        post_type: str = CONFIG.TYPE_TV_SHOWS,
+        frontier_page: tuple = None,
+        incremental: bool = False,
+    ):
+        self.page_changes = 0
+        if frontier_page is None:
+            return self._crawl_page(url, post_type, incremental)
+
+        frontier.start_page(*frontier_page)
+        self.frontier_page = frontier_page
+        try:
+            crawled_page = self._crawl_page(url, post_type, incremental)
+        except Exception as e:
+            frontier.fail_page(*frontier_page, repr(e))
+            raise
+        finally:
+            self.frontier_page = None
+
+        frontier.finish_page(*frontier_page)
+        return crawled_page
+
+    def _crawl_page(
+        self, url, post_type: str = CONFIG.TYPE_TV_SHOWS, incremental: bool = False
+    ):
+        soup = self.crawl_soup(url, only=LISTING_ONLY)
 
         film_list_wrap = soup.find("div", class_="film_list-wrap")
         if not film_list_wrap:
@@ -175,8 +285,48 @@ class Crawler:
         if not flw_items:
             return 0
 
-        for flw_item in flw_items:
-            self.crawl_flw_item(flw_item=flw_item, post_type=post_type)
+        items = self.parse_flw_items(flw_items)
+        scheduler.track(items, post_type)
+        if self.frontier_page:
+            # Resuming an interrupted page: don't redo the items it already finished
+            settled = frontier.settled_slugs(*self.frontier_page)
+            items = [item for item in items if item["slug"] not in settled]
+
+        self.listing_post_type = post_type
+        self.listing_digests = {
+            item["slug"]: listing_fingerprint(item) for item in items
+        }
+        if incremental:
+            # Same card as when the film was last stored: skip the detail fetch
+            changed_items = [
+                item
+                for item in items
+                if fingerprint_store.get(post_type, item["slug"], table="listings")
+                != self.listing_digests[item["slug"]]
+            ]
+            # A card whose detail crawl keeps failing would look changed on every
+            # pass and keep the walk from stopping; the full sweep still retries it
+            items = [
+                item
+                for item in changed_items
+                if not fingerprint_store.is_failing(
+                    post_type, item["slug"], self.listing_digests[item["slug"]]
+                )
+            ]
+            metrics.inc(
+                "listing_unchanged", len(self.listing_digests) - len(changed_items)
+            )
+            metrics.inc("listing_failing", len(changed_items) - len(items))
+
+        if self.frontier_page:
+            frontier.start_items(*self.frontier_page, [item["slug"] for item in items])
+
+        self.page_changes = len(items)
+        try:
+            self.crawl_items(items, post_type=post_type)
+        finally:
+            self.listing_digests = None
+        fingerprint_store.report()
 
         return 1
 
@@ -185,7 +335,7 @@ class Crawler:
         url: str = CONFIG.TINYZONETV_HOMEPAGE,
     ):
         try:
-            soup = self.crawl_soup(url)
+            soup = self.crawl_soup(url, only=HOMEPAGE_ONLY)
 
             block_area_homes = soup.find_all("section", class_="block_area_home")
             if len(block_area_homes) != 4:
@@ -193,18 +343,25 @@ class Crawler:
                 return
 
             tv_show_flw_items = block_area_homes[-1].find_all("div", class_="flw-item")
-            for flw_item in tv_show_flw_items:
-                self.crawl_flw_item(flw_item=flw_item, post_type=CONFIG.TYPE_TV_SHOWS)
+            tv_show_items = self.parse_flw_items(tv_show_flw_items)
+            scheduler.track(tv_show_items, CONFIG.TYPE_TV_SHOWS, is_latest=True)
+            self.crawl_items(tv_show_items, post_type=CONFIG.TYPE_TV_SHOWS)
 
-            tv_show_flw_items = block_area_homes[-2].find_all("div", class_="flw-item")
-            for flw_item in tv_show_flw_items:
-                self.crawl_flw_item(flw_item=flw_item, post_type=CONFIG.TYPE_MOVIE)
+            movie_flw_items = block_area_homes[-2].find_all("div", class_="flw-item")
+            movie_items = self.parse_flw_items(movie_flw_items)
+            scheduler.track(movie_items, CONFIG.TYPE_MOVIE, is_latest=True)
+            self.crawl_items(movie_items, post_type=CONFIG.TYPE_MOVIE)
+            fingerprint_store.report()
 
-            return
+            return tv_show_items + movie_items
         except Exception as e:
             print(e)
 
 
+def parse_detail_page(content: bytes, item: dict, post_type: str):
+    return Crawler().parse_film(soup=parse_html(content), **item, post_type=post_type)
+
+
 if __name__ == "__main__":
     Crawler().crawl_page(url=CONFIG.TINYZONETV_TVSHOWS_PAGE + "?page=1")
     # Crawler().crawl_page(url=CONFIG.TINYZONETV_MOVIES_PAGE, post_type=CONFIG.TYPE_MOVIE)
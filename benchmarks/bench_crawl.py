@@ -0,0 +1,216 @@
+import argparse
+import json
+import logging
+import tempfile
+import time
+import types
+from collections import defaultdict
+from pathlib import Path
+
+from _db import database
+from _fingerprints import fingerprint_store
+from _http_cache import http_cache
+from _parser import parse_html
+from _profiler import query_profiler
+from base import Crawler
+from benchmarks.sqlite_db import count_rows, install
+from crawlers import get_crawler
+from dootheme import Dootheme
+from helper import helper
+from settings import CONFIG
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+FIXTURES = {
+    "homepage": "homepage.html",
+    "listing": "listing.html",
+    "detail_tvshow": "detail_tvshow.html",
+    "detail_movie": "detail_movie.html",
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = defaultdict(list)
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.timings[stage].append(time.perf_counter() - start)
+
+        return timed
+
+    def percentiles(self, stage: str) -> dict:
+        values = sorted(self.timings[stage])
+        if not values:
+            return {}
+
+        def pick(p):
+            return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+        return {"n": len(values), "p50": pick(50), "p95": pick(95), "p99": pick(99)}
+
+
+def fake_download(url: str):
+    url_class = http_cache.url_class(url)
+    if url_class == "detail":
+        url_class = "detail_tvshow" if "/tv/" in url else "detail_movie"
+
+    content = (FIXTURES_DIR / FIXTURES[url_class]).read_bytes()
+    if url_class == "listing":
+        # Give every listing page its own set of slugs
+        page = url.split("page=")[-1]
+        content = content.replace(b"watch-show-", f"watch-p{page}-show-".encode())
+
+    return types.SimpleNamespace(content=content, status_code=200)
+
+
+def patch_stages(recorder: Recorder, conn):
+    helper.download_url = recorder.wrap("fetch", fake_download)
+    Crawler.parse_film = recorder.wrap("parse", Crawler.parse_film)
+
+    save_film = Crawler.save_film
+
+    def counted_save_film(self, film_data, episodes_data):
+        queries = conn.queries
+        save_film(self, film_data, episodes_data)
+        recorder.timings["queries_per_film"].append(conn.queries - queries)
+
+    Crawler.save_film = recorder.wrap("write", counted_save_film)
+
+
+def run_crawl_page(crawler, pages: int) -> dict:
+    start = time.perf_counter()
+    for page in range(1, pages + 1):
+        crawler.crawl_page(f"{CONFIG.TINYZONETV_TVSHOWS_PAGE}?page={page}")
+    elapsed = time.perf_counter() - start
+
+    return {"seconds": elapsed, "items": pages * 32}
+
+
+def run_insert_film(films: int, conn, batched: bool = False) -> dict:
+    content = (FIXTURES_DIR / FIXTURES["detail_tvshow"]).read_bytes()
+    crawler = Crawler()
+    parsed = [
+        crawler.parse_film(
+            soup=parse_html(content),
+            title="",
+            slug=f"watch-insert-film-{i}-{batched:d}",
+            fd_infor=[],
+            quality="HD",
+            cover_src="",
+            href=f"{CONFIG.TINYZONETV_HOMEPAGE}/tv/watch-insert-film-{i}-{batched:d}",
+            post_type=CONFIG.TYPE_TV_SHOWS,
+        )
+        for i in range(films)
+    ]
+
+    queries = conn.queries
+    start = time.perf_counter()
+    if batched:
+        # One transaction, with the films' meta rows sharing multi-row INSERTs
+        with database.transaction(), database.batch():
+            for film_data, episodes_data in parsed:
+                Dootheme(film=film_data, episodes=episodes_data).insert_film()
+    else:
+        for film_data, episodes_data in parsed:
+            Dootheme(film=film_data, episodes=episodes_data).insert_film()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "items": films,
+        "queries_per_film": (conn.queries - queries) / films,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline crawl and insert benchmark against an SQLite stand-in. "
+        "Run from the repository root: python -m benchmarks.bench_crawl"
+    )
+    parser.add_argument("--mode", default="sync", help="crawl mode (sync, pipeline)")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--films", type=int, default=20)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare with a saved JSON file")
+    parser.add_argument(
+        "--profile", action="store_true", help="print the query profile at the end"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    workdir = tempfile.mkdtemp(prefix="tinyzonetv-bench-")
+    http_cache.enabled = False
+    fingerprint_store.path = f"{workdir}/fingerprints.sqlite3"
+    conn = install(database, f"{workdir}/wordpress.sqlite3")
+    query_profiler.enabled = args.profile
+    query_profiler.slow_ms = float("inf")
+
+    recorder = Recorder()
+    patch_stages(recorder, conn)
+    crawler = get_crawler(args.mode)
+
+    results = {}
+    for scenario in ["cold", "recrawl_unchanged", "recrawl_check_path"]:
+        if scenario == "recrawl_check_path":
+            fingerprint_store.get_conn().execute("DELETE FROM fingerprints")
+            fingerprint_store.get_conn().commit()
+        recorder.timings.clear()
+        run = run_crawl_page(crawler, args.pages)
+        results[f"crawl_page.{scenario}"] = {
+            "items_per_sec": run["items"] / run["seconds"],
+            "queries_per_film": sum(recorder.timings["queries_per_film"])
+            / max(1, len(recorder.timings["queries_per_film"])),
+            **{
+                f"{stage}_{k}": v
+                for stage in ["fetch", "parse", "write"]
+                for k, v in recorder.percentiles(stage).items()
+                if k != "n"
+            },
+        }
+
+    for name, batched in [("insert_film", False), ("insert_film_batched", True)]:
+        run = run_insert_film(args.films, conn, batched=batched)
+        results[name] = {
+            "items_per_sec": run["items"] / run["seconds"],
+            "queries_per_film": run["queries_per_film"],
+        }
+
+    for name, metrics in results.items():
+        print(name)
+        for key, value in metrics.items():
+            print(f"  {key:<22}{value:>12.2f}")
+    print(
+        "rows: "
+        + ", ".join(
+            f"{table}={count_rows(conn, table)}"
+            for table in ["posts", "postmeta", "terms", "term_relationships"]
+        )
+    )
+
+    if args.profile:
+        print(f"\n{query_profiler.report()}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(f"\nvs {args.compare}")
+        for name, metrics in results.items():
+            for key, value in metrics.items():
+                before = baseline.get(name, {}).get(key)
+                if before:
+                    change = (value - before) / before * 100
+                    print(
+                        f"  {name}.{key:<22}{before:>10.2f} -> {value:>10.2f}"
+                        f" ({change:+.1f}%)"
+                    )
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import importlib.util
+import time
+from pathlib import Path
+
+from _parser import PARSER_BACKENDS, parse_html
+from base import Crawler
+from settings import CONFIG
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+DETAIL_FIXTURES = {
+    "detail_tvshow.html": CONFIG.TYPE_TV_SHOWS,
+    "detail_movie.html": CONFIG.TYPE_MOVIE,
+}
+
+OPTIONAL_BACKEND_MODULES = {"lxml": "lxml", "lexbor": "selectolax"}
+
+
+def is_available(backend: str) -> bool:
+    module = OPTIONAL_BACKEND_MODULES.get(backend)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def parse_and_extract(crawler: Crawler, content: bytes, post_type: str, backend: str):
+    soup = parse_html(content, backend)
+    return crawler.parse_film(
+        soup=soup,
+        title="",
+        slug="benchmark",
+        fd_infor=[],
+        quality="HD",
+        cover_src="",
+        href=f"{CONFIG.TINYZONETV_HOMEPAGE}/benchmark",
+        post_type=post_type,
+    )
+
+
+def bench(fixture: str, post_type: str, backend: str, rounds: int) -> float:
+    crawler = Crawler()
+    content = (FIXTURES_DIR / fixture).read_bytes()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        parse_and_extract(crawler, content, post_type, backend)
+
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse+extract time per detail page for each parser backend. "
+        "Run from the repository root: python -m benchmarks.bench_parsers"
+    )
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    backends = [backend for backend in PARSER_BACKENDS if is_available(backend)]
+    crawler = Crawler()
+    for fixture, post_type in DETAIL_FIXTURES.items():
+        content = (FIXTURES_DIR / fixture).read_bytes()
+        expected = parse_and_extract(crawler, content, post_type, "html.parser")
+        for backend in backends:
+            if parse_and_extract(crawler, content, post_type, backend) != expected:
+                print(f"WARNING: {backend} extracts different data from {fixture}")
+
+    print(f"{'fixture':<22}{'backend':<14}{'ms/page':>10}{'speedup':>10}")
+    for fixture, post_type in DETAIL_FIXTURES.items():
+        baseline = None
+        for backend in backends:
+            ms = bench(fixture, post_type, backend, args.rounds)
+            baseline = baseline or ms
+            print(f"{fixture:<22}{backend:<14}{ms:>10.2f}{baseline / ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
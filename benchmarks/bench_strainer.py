@@ -0,0 +1,77 @@
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+from _parser import parse_html
+from base import HOMEPAGE_ONLY, LISTING_ONLY, Crawler
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def listing_items(soup) -> list:
+    film_list_wrap = soup.find("div", class_="film_list-wrap")
+    return film_list_wrap.find_all("div", class_="flw-item")
+
+
+def homepage_items(soup) -> list:
+    block_area_homes = soup.find_all("section", class_="block_area_home")
+    return block_area_homes[-1].find_all("div", class_="flw-item") + block_area_homes[
+        -2
+    ].find_all("div", class_="flw-item")
+
+
+PAGES = {
+    "listing.html": (LISTING_ONLY, listing_items),
+    "homepage.html": (HOMEPAGE_ONLY, homepage_items),
+}
+
+
+def parse_and_extract(content: bytes, backend: str, only: tuple, get_items) -> list:
+    soup = parse_html(content, backend, only=only)
+    return Crawler().parse_flw_items(get_items(soup))
+
+
+def measure(content: bytes, backend: str, only: tuple, get_items, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        parse_and_extract(content, backend, only, get_items)
+    ms = (time.perf_counter() - start) / rounds * 1000
+
+    tracemalloc.start()
+    parse_and_extract(content, backend, only, get_items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return ms, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Full vs partial-tree parsing of listing and homepage fixtures. "
+        "Run from the repository root: python -m benchmarks.bench_strainer"
+    )
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--backend", default="html.parser")
+    args = parser.parse_args()
+
+    print(f"{'fixture':<16}{'parse':<9}{'items':>6}{'ms/page':>10}{'peak KiB':>10}")
+    for fixture, (only, get_items) in PAGES.items():
+        content = (FIXTURES_DIR / fixture).read_bytes()
+        full_items = parse_and_extract(content, args.backend, None, get_items)
+        partial_items = parse_and_extract(content, args.backend, only, get_items)
+        if full_items != partial_items:
+            print(f"WARNING: partial parse of {fixture} extracts different items")
+
+        for label, parse_only, items in [
+            ("full", None, full_items),
+            ("partial", only, partial_items),
+        ]:
+            ms, peak = measure(
+                content, args.backend, parse_only, get_items, args.rounds
+            )
+            print(f"{fixture:<16}{label:<9}{len(items):>6}{ms:>10.2f}{peak:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import re
+import sqlite3
+
+from settings import CONFIG
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {prefix}posts (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_author INTEGER NOT NULL DEFAULT 0,
+    post_date TEXT, post_date_gmt TEXT,
+    post_content TEXT, post_title TEXT, post_excerpt TEXT,
+    post_status TEXT DEFAULT 'publish',
+    comment_status TEXT, ping_status TEXT, post_password TEXT,
+    post_name TEXT, to_ping TEXT, pinged TEXT,
+    post_modified TEXT, post_modified_gmt TEXT,
+    post_content_filtered TEXT,
+    post_parent INTEGER DEFAULT 0, guid TEXT, menu_order INTEGER DEFAULT 0,
+    post_type TEXT, post_mime_type TEXT, comment_count INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS {prefix}posts_post_name ON {prefix}posts (post_name);
+CREATE INDEX IF NOT EXISTS {prefix}posts_type_status_date
+    ON {prefix}posts (post_type, post_status, post_date, ID);
+CREATE TABLE IF NOT EXISTS {prefix}postmeta (
+    meta_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_id INTEGER NOT NULL DEFAULT 0,
+    meta_key TEXT, meta_value TEXT
+);
+CREATE INDEX IF NOT EXISTS {prefix}postmeta_post_id ON {prefix}postmeta (post_id);
+CREATE INDEX IF NOT EXISTS {prefix}postmeta_meta_key ON {prefix}postmeta (meta_key);
+CREATE TABLE IF NOT EXISTS {prefix}terms (
+    term_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL DEFAULT '', slug TEXT NOT NULL DEFAULT '',
+    term_group INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS {prefix}terms_slug ON {prefix}terms (slug);
+CREATE INDEX IF NOT EXISTS {prefix}terms_name ON {prefix}terms (name);
+CREATE TABLE IF NOT EXISTS {prefix}term_taxonomy (
+    term_taxonomy_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    term_id INTEGER NOT NULL DEFAULT 0,
+    taxonomy TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    parent INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (term_id, taxonomy)
+);
+CREATE INDEX IF NOT EXISTS {prefix}term_taxonomy_taxonomy
+    ON {prefix}term_taxonomy (taxonomy);
+CREATE TABLE IF NOT EXISTS {prefix}term_relationships (
+    object_id INTEGER NOT NULL DEFAULT 0,
+    term_taxonomy_id INTEGER NOT NULL DEFAULT 0,
+    term_order INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (object_id, term_taxonomy_id)
+);
+CREATE INDEX IF NOT EXISTS {prefix}term_relationships_term_taxonomy_id
+    ON {prefix}term_relationships (term_taxonomy_id);
+CREATE TABLE IF NOT EXISTS {prefix}termmeta (
+    meta_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    term_id INTEGER NOT NULL DEFAULT 0,
+    meta_key TEXT, meta_value TEXT
+);
+"""
+
+
+SERVER_VARIABLES = {
+    "@@max_allowed_packet": "16777216",
+    "@@auto_increment_increment": "1",
+    "@@innodb_autoinc_lock_mode": "1",
+}
+
+
+def to_sqlite(query: str) -> str:
+    for variable, value in SERVER_VARIABLES.items():
+        query = query.replace(variable, value)
+    if query.startswith("INSERT IGNORE "):
+        query = "INSERT OR IGNORE " + query[len("INSERT IGNORE ") :]
+    if " ON DUPLICATE KEY UPDATE " in query:
+        query = query.replace(
+            " ON DUPLICATE KEY UPDATE ", " ON CONFLICT DO UPDATE SET "
+        )
+        query = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", query)
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.sqlite.cursor()
+        self.first_id = None
+
+    def execute(self, query: str, data=None):
+        self.conn.queries += 1
+        self.cur.execute(to_sqlite(query), data or ())
+        self.first_id = None
+        if query.lstrip().upper().startswith("INSERT") and self.cur.rowcount > 1:
+            # MySQL reports the first id of a multi-row INSERT, SQLite the last
+            self.first_id = self.cur.lastrowid - self.cur.rowcount + 1
+
+    def executemany(self, query: str, data):
+        self.conn.queries += 1
+        self.cur.executemany(to_sqlite(query), data)
+
+    def fetchall(self) -> list:
+        return self.cur.fetchall()
+
+    def fetchmany(self, size: int) -> list:
+        return self.cur.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self.first_id or self.cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cur.rowcount
+
+    def close(self):
+        self.cur.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str = ":memory:"):
+        self.sqlite = sqlite3.connect(path, check_same_thread=False)
+        self.sqlite.executescript(SCHEMA.format(prefix=CONFIG.TABLE_PREFIX))
+        self.queries = 0
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.sqlite.in_transaction
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self)
+
+    def start_transaction(self):
+        self.sqlite.execute("BEGIN")
+
+    def commit(self):
+        self.sqlite.commit()
+
+    def rollback(self):
+        self.sqlite.rollback()
+
+    def reconnect(self, attempts: int = 1, delay: int = 0):
+        pass
+
+    def close(self):
+        # Sessions "return" the connection here; keep it open like a pool would
+        pass
+
+
+def install(database, path: str = ":memory:") -> SQLiteConnection:
+    conn = SQLiteConnection(path)
+    database.get_conn = lambda: conn
+    return conn
+
+
+def count_rows(conn: SQLiteConnection, table: str) -> int:
+    table = re.sub(r"\W", "", table)
+    return conn.sqlite.execute(
+        f"SELECT COUNT(*) FROM {CONFIG.TABLE_PREFIX}{table}"
+    ).fetchone()[0]
@@ -0,0 +1,16 @@
+from async_crawler import AsyncCrawler
+from base import Crawler
+from pipeline import PipelineCrawler
+from settings import CONFIG
+
+CRAWL_MODE = getattr(CONFIG, "CRAWL_MODE", "sync")
+
+CRAWLERS = {
+    "sync": Crawler,
+    "async": AsyncCrawler,
+    "pipeline": PipelineCrawler,
+}
+
+
+def get_crawler(mode: str = CRAWL_MODE) -> Crawler:
+    return CRAWLERS[mode]()
@@ -7,6 +7,10 @@ from phpserialize import serialize, unserialize
 from slugify import slugify
 
 from _db import database
+from _metrics import metrics
+from _postmeta import postmeta_writer
+from _posts import post_index
+from _terms import term_resolver
 from helper import helper
 from settings import CONFIG
 
@@ -45,6 +49,8 @@ class Dootheme:
         self.film["quality"] = self.film["extra_info"].get("Quality", "HD")
         self.episode = {}
         self.episodes = episodes
+        self.inserted = {"films": 0, "seasons": 0, "episodes": 0}
+        self.pending_terms = []
 
     def format_slug(self, slug: str) -> str:
         return slug.replace("’", "").replace("'", "")
@@ -53,9 +59,7 @@ class Dootheme:
         return equal_condition.replace("\n", "").strip().lower()
 
     def insert_postmeta(self, postmeta_data: list, table: str = "postmeta"):
-        database.insert_into(
-            table=f"{CONFIG.TABLE_PREFIX}{table}", data=postmeta_data, is_bulk=True
-        )
+        postmeta_writer.write(postmeta_data, table=table)
 
     def get_season_number(self, season_str: str) -> str:
         season_str = season_str.replace("\n", " ").lower()
@@ -80,43 +84,28 @@ class Dootheme:
             )
         except Exception as e:
             print(e)
-        termIds = []
+        # Resolved and linked together with the film's other terms
         for term in terms:
-            term_insert_slug = slugify(term_slug) if term_slug else slugify(term)
-            cols = "tt.term_taxonomy_id, tt.term_id"
-            table = (
-                f"{CONFIG.TABLE_PREFIX}term_taxonomy tt, {CONFIG.TABLE_PREFIX}terms t"
+            self.pending_terms.append(
+                (post_id, taxonomy, term, slugify(term_slug) if term_slug else "")
             )
-            condition = f't.slug = "{term_insert_slug}" AND tt.term_id=t.term_id AND tt.taxonomy="{taxonomy}"'
 
-            be_term = database.select_all_from(
-                table=table, condition=condition, cols=cols
-            )
-            if not be_term:
-                term_id = database.insert_into(
-                    table=f"{CONFIG.TABLE_PREFIX}terms",
-                    data=(term, slugify(term), 0),
-                )
-                termIds = [term_id, True]
-                term_taxonomy_count = 0  # 1 if taxonomy == "seasons" else 0
-                term_taxonomy_id = database.insert_into(
-                    table=f"{CONFIG.TABLE_PREFIX}term_taxonomy",
-                    data=(term_id, taxonomy, "", 0, term_taxonomy_count),
-                )
-            else:
-                term_taxonomy_id = be_term[0][0]
-                term_id = be_term[0][1]
-                termIds = [term_id, False]
-
-            try:
-                database.insert_into(
-                    table=f"{CONFIG.TABLE_PREFIX}term_relationships",
-                    data=(post_id, term_taxonomy_id, 0),
+    def insert_relationships(self):
+        pending_terms, self.pending_terms = self.pending_terms, []
+        resolved = term_resolver.resolve_many(
+            [(taxonomy, name, slug) for _, taxonomy, name, slug in pending_terms]
+        )
+        database.insert_into(
+            table=f"{CONFIG.TABLE_PREFIX}term_relationships",
+            data=[
+                (post_id, term_taxonomy_id, 0)
+                for (post_id, _, _, _), (term_taxonomy_id, _, _) in zip(
+                    pending_terms, resolved
                 )
-            except:
-                pass
-
-        return termIds
+            ],
+            is_bulk=True,
+            on_duplicate="ignore",
+        )
 
     def insert_movie_details(self, post_id):
         if not self.episodes:
@@ -228,6 +217,7 @@ class Dootheme:
     def insert_post(self, post_data: dict) -> int:
         data = self.generate_post(post_data)
         post_id = database.insert_into(table=f"{CONFIG.TABLE_PREFIX}posts", data=data)
+        post_index.add(post_data["post_type"], post_data["slug"], post_id)
         return post_id
 
     def insert_film_to_database(self, post_data: dict) -> int:
@@ -300,18 +290,16 @@ class Dootheme:
                     self.insert_terms(
                         post_id=post_id, terms=post_data[taxonomy], taxonomy=taxonomy
                     )
+            self.insert_relationships()
 
             return post_id
         except Exception as e:
             helper.error_log(f"Failed to insert film\n{e}")
+            raise
 
     def insert_root_film(self) -> list:
-        condition_post_name = self.film["slug"]
-        condition = f"""post_name = '{condition_post_name}' AND post_type='{self.film["post_type"]}'"""
-        be_post = database.select_all_from(
-            table=f"{CONFIG.TABLE_PREFIX}posts", condition=condition
-        )
-        if not be_post:
+        be_post_id = post_index.get_id(self.film["post_type"], self.film["slug"])
+        if not be_post_id:
             logging.info(f'Inserting root film: {self.film["post_title"]}')
             post_data = self.generate_film_data(
                 self.film["post_title"],
@@ -323,9 +311,12 @@ class Dootheme:
                 self.film["extra_info"],
             )
 
-            return [self.insert_film_to_database(post_data), True]
+            post_id = self.insert_film_to_database(post_data)
+            self.inserted["films"] += 1
+
+            return [post_id, True]
         else:
-            return [be_post[0][0], False]
+            return [be_post_id, False]
 
     def update_season_number_of_episodes(self, season_term_id, number_of_episodes):
         try:
@@ -373,13 +364,7 @@ class Dootheme:
                 self.film["slug"] + f" {self.film['season_number']}x{episode_number}"
             )
             episode_self_slug = slugify(episode_self_slug)
-            condition = (
-                f"""post_name = '{episode_self_slug}' AND post_type='episodes'"""
-            )
-            be_post = database.select_all_from(
-                table=f"{CONFIG.TABLE_PREFIX}posts", condition=condition
-            )
-            if not be_post:
+            if not post_index.get_id("episodes", episode_self_slug):
                 logging.info(f"Inserting episodes: {episode_self_title}")
                 post_data = self.generate_film_data(
                     episode_self_title,
@@ -392,6 +377,7 @@ class Dootheme:
                 )
 
                 episode_id = self.insert_post(post_data)
+                self.inserted["episodes"] += 1
                 episode_links = [
                     f"https://www.2embed.to/embed/tmdb/tv?id={self.episodes.get('tmdb_id', '0')}&s={self.film['season_number']}&e={episode_number}"
                 ]
@@ -457,11 +443,8 @@ class Dootheme:
         )
         season_slug = self.film["slug"] + ": Season " + self.film["season_number"]
         season_slug = slugify(season_slug)
-        condition = f"""post_name = '{season_slug}' AND post_type='seasons'"""
-        be_post = database.select_all_from(
-            table=f"{CONFIG.TABLE_PREFIX}posts", condition=condition
-        )
-        if not be_post:
+        be_season_id = post_index.get_id("seasons", season_slug)
+        if not be_season_id:
             logging.info(f"Inserting season: {season_title}")
             post_data = self.generate_film_data(
                 season_title,
@@ -474,6 +457,7 @@ class Dootheme:
             )
 
             season_id = self.insert_post(post_data)
+            self.inserted["seasons"] += 1
             season_postmeta = [
                 (
                     season_id,
@@ -513,9 +497,17 @@ class Dootheme:
 
             return season_id
         else:
-            return be_post[0][0]
+            return be_season_id
 
     def insert_film(self):
+        with database.transaction():
+            self._insert_film()
+
+        # Counted after commit so rolled back films don't show up as inserted
+        for kind, count in self.inserted.items():
+            metrics.inc(f"{kind}_inserted", count)
+
+    def _insert_film(self):
         self.film["post_title"] = self.film["title"]
 
         post_id, isNewPostInserted = self.insert_root_film()
@@ -1,12 +1,13 @@
 from datetime import datetime, timedelta
 from pathlib import Path
-from time import sleep
 
-import requests
 from bs4 import BeautifulSoup
 from slugify import slugify
 
 from _db import database
+from _http import http_client
+from _postmeta import postmeta_writer
+from _terms import term_resolver
 from settings import CONFIG
 
 
@@ -29,7 +30,7 @@ class Helper:
             print(f"{datetime_msg} LOG:  {msg}\n{'-' * 80}", file=f)
 
     def download_url(self, url):
-        return requests.get(url, headers=self.get_header())
+        return http_client.get(url, headers=self.get_header())
 
     def format_text(self, text: str) -> str:
         return text.strip("\n").replace('"', "'").strip().replace("’", "'")
@@ -317,36 +318,15 @@ class Helper:
         return equal_condition.replace("\n", "").strip().lower()
 
     def insert_terms(self, post_id: int, terms: list, taxonomy: str):
-        for term in terms:
-            term_name = self.format_condition_str(term)
-            cols = "tt.term_taxonomy_id"
-            table = (
-                f"{CONFIG.TABLE_PREFIX}term_taxonomy tt, {CONFIG.TABLE_PREFIX}terms t"
-            )
-            condition = f't.name = "{term_name}" AND tt.term_id=t.term_id AND tt.taxonomy="{taxonomy}"'
-
-            be_term = database.select_all_from(
-                table=table, condition=condition, cols=cols
-            )
-            if not be_term:
-                term_id = database.insert_into(
-                    table=f"{CONFIG.TABLE_PREFIX}terms",
-                    data=(term, slugify(term), 0),
-                )
-                term_taxonomy_id = database.insert_into(
-                    table=f"{CONFIG.TABLE_PREFIX}term_taxonomy",
-                    data=(term_id, taxonomy, "", 0, 0),
-                )
-            else:
-                term_taxonomy_id = be_term[0][0]
-
-            try:
-                database.insert_into(
-                    table=f"{CONFIG.TABLE_PREFIX}term_relationships",
-                    data=(post_id, term_taxonomy_id, 0),
-                )
-            except:
-                pass
+        resolved = term_resolver.resolve_many([(taxonomy, term, "") for term in terms])
+        database.insert_into(
+            table=f"{CONFIG.TABLE_PREFIX}term_relationships",
+            data=[
+                (post_id, term_taxonomy_id, 0) for term_taxonomy_id, _, _ in resolved
+            ],
+            is_bulk=True,
+            on_duplicate="ignore",
+        )
 
     def generate_post(self, post_data: dict) -> tuple:
         timeupdate = self.get_timeupdate()
@@ -570,22 +550,10 @@ class Helper:
             )
         )
 
-        for row in postmeta_data:
-            database.insert_into(
-                table=f"{CONFIG.TABLE_PREFIX}postmeta",
-                data=row,
-            )
-            sleep(0.01)
-
-        sleep(0.01)
+        self.insert_postmeta(postmeta_data)
 
     def insert_postmeta(self, postmeta_data):
-        for row in postmeta_data:
-            database.insert_into(
-                table=f"{CONFIG.TABLE_PREFIX}postmeta",
-                data=row,
-            )
-            sleep(0.01)
+        postmeta_writer.write(postmeta_data)
 
 
 helper = Helper()
@@ -1,25 +1,40 @@
 import logging
 import time
 
-from base import Crawler
+from _metrics import metrics
+from _pagination import FULL_SWEEP_EVERY, INCREMENTAL_CRAWL, PageWalker
+from crawlers import get_crawler
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 
-crawler = Crawler()
+crawler = get_crawler()
+
+
+def get_walker(kind: str, incremental: bool = False) -> PageWalker:
+    return PageWalker(
+        crawler,
+        kind=kind,
+        url=CONFIG.TINYZONETV_MOVIES_PAGE,
+        last_page=CONFIG.TINYZONETV_MOVIES_LAST_PAGE,
+        post_type=CONFIG.TYPE_MOVIE,
+        wrap_page=2,
+        incremental=incremental,
+    )
+
 
 if __name__ == "__main__":
-    i = 1
+    metrics.start()
+    full_sweep = get_walker("movies")
+    incremental = get_walker("movies_incremental", incremental=True)
+    cycle = 0
     while True:
-        try:
-            crawled_page = crawler.crawl_page(
-                f"{CONFIG.TINYZONETV_MOVIES_PAGE}?page={i}",
-                post_type=CONFIG.TYPE_MOVIE,
-            )
-            if not crawled_page and i >= CONFIG.TINYZONETV_MOVIES_LAST_PAGE:
-                i = 2
-            else:
-                i += 1
-        except Exception as e:
-            pass
+        if not INCREMENTAL_CRAWL:
+            full_sweep.step()
+        else:
+            incremental.step()
+            if cycle % FULL_SWEEP_EVERY == 0:
+                full_sweep.step()
+        cycle += 1
+        metrics.maybe_report()
         time.sleep(CONFIG.WAIT_BETWEEN_ALL)
@@ -0,0 +1,155 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+
+from _metrics import metrics
+from _parser import parse_html
+from base import Crawler, parse_detail_page
+from helper import helper
+from settings import CONFIG
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+PIPELINE_FETCHERS = getattr(CONFIG, "PIPELINE_FETCHERS", 8)
+PIPELINE_PARSERS = getattr(CONFIG, "PIPELINE_PARSERS", 2)
+PIPELINE_WRITERS = getattr(CONFIG, "PIPELINE_WRITERS", 1)
+PIPELINE_QUEUE_SIZE = getattr(CONFIG, "PIPELINE_QUEUE_SIZE", 16)
+PIPELINE_REPORT_INTERVAL = getattr(CONFIG, "PIPELINE_REPORT_INTERVAL", 10)
+PIPELINE_PARSE_MODE = getattr(CONFIG, "PIPELINE_PARSE_MODE", "thread")
+PIPELINE_PARSE_PROCESSES = getattr(
+    CONFIG, "PIPELINE_PARSE_PROCESSES", os.cpu_count() or 1
+)
+
+STOP = object()
+
+
+class PipelineCrawler(Crawler):
+    def __init__(
+        self,
+        fetchers: int = PIPELINE_FETCHERS,
+        parsers: int = PIPELINE_PARSERS,
+        writers: int = PIPELINE_WRITERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        parse_mode: str = PIPELINE_PARSE_MODE,
+        parse_processes: int = PIPELINE_PARSE_PROCESSES,
+    ):
+        self.workers = {"fetch": fetchers, "parse": parsers, "write": writers}
+        self.queue_size = queue_size
+        self.queues = {}
+        self.parse_mode = parse_mode
+        self.parse_processes = parse_processes
+        self.process_pool = None
+        self._pool_lock = threading.Lock()
+        if parse_mode == "process":
+            # One parser thread per process keeps every worker busy
+            self.workers["parse"] = parse_processes
+
+    def get_process_pool(self) -> ProcessPoolExecutor:
+        # Created on first use: spawned workers re-import the entry script, whose
+        # top-level get_crawler() would otherwise start a pool in every worker
+        with self._pool_lock:
+            if self.process_pool is None:
+                # Spawn rather than fork: this process already runs stage threads
+                self.process_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self.process_pool
+
+    def fetch(self, job: tuple) -> tuple:
+        item, post_type = job
+        logging.info(f"Crawling {item['href']}")
+
+        return item, post_type, helper.download_url(item["href"]).content
+
+    def parse(self, job: tuple) -> tuple:
+        item, post_type, content = job
+        if self.parse_mode == "process":
+            # The worker's own metrics stay in its process; time the round trip here
+            with metrics.time("parse"):
+                return (
+                    self.get_process_pool()
+                    .submit(parse_detail_page, content, item, post_type)
+                    .result()
+                )
+
+        return self.parse_film(soup=parse_html(content), **item, post_type=post_type)
+
+    def write(self, job: tuple):
+        film_data, episodes_data = job
+        self.save_film(film_data, episodes_data)
+
+    def depths(self) -> dict:
+        return {name: queue.qsize() for name, queue in self.queues.items()}
+
+    def run_stage(self, name: str, func, in_queue: Queue, out_queue: Queue) -> list:
+        def work():
+            while True:
+                job = in_queue.get()
+                if job is STOP:
+                    return
+
+                try:
+                    result = func(job)
+                except Exception as e:
+                    # Every stage's job starts with the item or film dict
+                    self.fail_item(job[0]["slug"], e)
+                    helper.error_log(
+                        msg=f"Error in {name} stage\n{e}",
+                        log_file="pipeline.log",
+                    )
+                    continue
+
+                # Blocks while the next stage is behind, which throttles this one
+                if out_queue is not None and result is not None:
+                    out_queue.put(result)
+
+        threads = [
+            threading.Thread(target=work, name=f"{name}-{i}", daemon=True)
+            for i in range(self.workers[name])
+        ]
+        for thread in threads:
+            thread.start()
+
+        return threads
+
+    def report(self, done: threading.Event):
+        while not done.wait(PIPELINE_REPORT_INTERVAL):
+            depths = ", ".join(f"{k}={v}" for k, v in self.depths().items())
+            logging.info(f"Pipeline queue depth: {depths}")
+
+    def crawl_items(self, items: list, post_type: str = CONFIG.TYPE_TV_SHOWS):
+        self.queues = {
+            name: Queue(maxsize=self.queue_size) for name in ["fetch", "parse", "write"]
+        }
+        stages = [
+            ("fetch", self.fetch, self.queues["parse"]),
+            ("parse", self.parse, self.queues["write"]),
+            ("write", self.write, None),
+        ]
+        threads = {
+            name: self.run_stage(name, func, self.queues[name], out_queue)
+            for name, func, out_queue in stages
+        }
+
+        done = threading.Event()
+        threading.Thread(target=self.report, args=(done,), daemon=True).start()
+
+        for item in items:
+            self.queues["fetch"].put((item, post_type))
+
+        # Drain stage by stage so every queued job reaches the writer
+        for name, _, _ in stages:
+            for _ in threads[name]:
+                self.queues[name].put(STOP)
+            for thread in threads[name]:
+                thread.join()
+
+        done.set()
+
+
+if __name__ == "__main__":
+    PipelineCrawler().crawl_page(url=CONFIG.TINYZONETV_TVSHOWS_PAGE + "?page=1")
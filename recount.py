@@ -0,0 +1,32 @@
+import argparse
+import logging
+import time
+
+from _metrics import metrics
+from _recount import RECOUNT_INTERVAL, term_recounter
+
+logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompute term_taxonomy.count for terms touched since the last run"
+    )
+    parser.add_argument("--full", action="store_true", help="recount every term")
+    parser.add_argument("--taxonomy", default="", help="only recount this taxonomy")
+    parser.add_argument("--once", action="store_true", help="run once and exit")
+    args = parser.parse_args()
+
+    metrics.start()
+    while True:
+        try:
+            term_recounter.run(
+                full=args.full or term_recounter.is_full_due(),
+                taxonomy=args.taxonomy,
+            )
+        except Exception as e:
+            logging.error(f"Recount failed: {e}")
+        if args.once:
+            break
+        metrics.maybe_report()
+        time.sleep(RECOUNT_INTERVAL)
@@ -1,24 +1,57 @@
 import logging
 import time
 
-from base import Crawler
+from _metrics import metrics
+from _pagination import FULL_SWEEP_EVERY, INCREMENTAL_CRAWL, PageWalker
+from _scheduler import SCHEDULER_PAGE_COST, RequestBudget, scheduler
+from crawlers import get_crawler
 from settings import CONFIG
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 
-crawler = Crawler()
+crawler = get_crawler()
+budget = RequestBudget()
+
+
+def get_walker(kind: str, incremental: bool = False) -> PageWalker:
+    return PageWalker(
+        crawler,
+        kind=kind,
+        url=CONFIG.TINYZONETV_TVSHOWS_PAGE,
+        last_page=CONFIG.TINYZONETV_TVSHOWS_LAST_PAGE,
+        post_type=CONFIG.TYPE_TV_SHOWS,
+        wrap_page=1,
+        incremental=incremental,
+    )
+
 
 if __name__ == "__main__":
-    i = 1
+    metrics.start()
+    full_sweep = get_walker("tvshows")
+    incremental = get_walker("tvshows_incremental", incremental=True)
+    cycle = 0
     while True:
-        try:
-            crawled_page = crawler.crawl_page(
-                f"{CONFIG.TINYZONETV_TVSHOWS_PAGE}?page={i}"
-            )
-            i += 1
-            if not crawled_page and i >= CONFIG.TINYZONETV_TVSHOWS_LAST_PAGE:
-                i = 1
-
-        except Exception as e:
-            pass
+        budget.refill()
+
+        # Shows that are due for a re-check go first, within their share
+        hot_items = scheduler.due(CONFIG.TYPE_TV_SHOWS, budget.hot_allowance())
+        if hot_items:
+            logging.info(f"Re-crawling {len(hot_items)} scheduled shows")
+            metrics.inc("scheduled_recrawls", len(hot_items))
+            try:
+                crawler.crawl_items(hot_items, post_type=CONFIG.TYPE_TV_SHOWS)
+            except Exception as e:
+                pass
+            budget.spend(len(hot_items))
+
+        # The page walks get the rest, one listing page at a time
+        if budget.tokens >= SCHEDULER_PAGE_COST:
+            if not INCREMENTAL_CRAWL:
+                budget.spend(full_sweep.step())
+            else:
+                budget.spend(incremental.step())
+                if cycle % FULL_SWEEP_EVERY == 0:
+                    budget.spend(full_sweep.step())
+            cycle += 1
+        metrics.maybe_report()
         time.sleep(CONFIG.WAIT_BETWEEN_ALL)
@@ -1,18 +1,24 @@
 import logging
 import time
 
-from base import Crawler
-from settings import CONFIG
+from _metrics import metrics
+from _poller import AdaptivePoller
+from crawlers import get_crawler
 
 logging.basicConfig(format="%(asctime)s %(levelname)s:%(message)s", level=logging.INFO)
 
 
-crawler = Crawler()
+crawler = get_crawler()
+poller = AdaptivePoller()
 
 if __name__ == "__main__":
+    metrics.start()
     while True:
+        items = None
         try:
-            crawler.update()
+            items = crawler.update()
         except Exception as e:
             pass
-        time.sleep(CONFIG.WAIT_BETWEEN_LATEST)
+        poller.observe(items)
+        metrics.maybe_report()
+        time.sleep(poller.interval)